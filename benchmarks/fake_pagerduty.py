@@ -0,0 +1,487 @@
+"""A local stand-in for the PagerDuty REST and Events APIs.
+
+Serves a generated account of configurable size with optional latency and
+injected 429 responses, and counts what it served. Used by the benchmark
+runner, which starts it in its own process, or on its own to point a
+development Home Assistant at, e.g.:
+
+    python -m benchmarks.fake_pagerduty --services 2000 --incidents 5000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+from collections import Counter
+from datetime import datetime, time, timedelta, timezone
+from aiohttp import web
+
+USER_ID = "PUSER00"
+CONTROL_PREFIX = "/_benchmark"
+SHIFT_LENGTH = timedelta(hours=12)
+SCHEDULE_DAYS = 120
+
+
+def _reference(kind, item_id, summary):
+    """Return a PagerDuty reference object."""
+    return {
+        "id": item_id,
+        "type": f"{kind}_reference",
+        "summary": summary,
+        "self": f"https://api.pagerduty.com/{kind}s/{item_id}",
+        "html_url": f"https://fake.pagerduty.com/{kind}s/{item_id}",
+    }
+
+
+class FakeAccount:
+    """A generated PagerDuty account."""
+
+    def __init__(
+        self,
+        services=2000,
+        incidents=5000,
+        schedules=50,
+        users=200,
+        teams=20,
+        seed=0,
+    ):
+        """Generate the account."""
+        rng = random.Random(seed)
+        now = datetime.now(timezone.utc)
+        self.teams = [
+            {
+                **_reference("team", f"PTEAM{i:03d}", f"Team {i}"),
+                "name": f"Team {i}",
+            }
+            for i in range(teams)
+        ]
+        self.users = [
+            {
+                **_reference("user", USER_ID if i == 0 else f"PU{i:05d}", ""),
+                "summary": f"User {i}",
+                "name": f"User {i}",
+                "email": f"user{i}@example.com",
+                "time_zone": "UTC",
+                "role": "user",
+                "teams": self.teams if i == 0 else [],
+            }
+            for i in range(users)
+        ]
+        self.services = [
+            {
+                **_reference("service", f"PS{i:05d}", f"Service {i}"),
+                "name": f"Service {i}",
+                "status": "active",
+                "teams": [self.teams[i % teams]],
+                "integrations": [],
+            }
+            for i in range(services)
+        ]
+        self.incidents = {}
+        for i in range(incidents):
+            service = self.services[rng.randrange(services)]
+            assignee = self.users[rng.randrange(users)]
+            incident_id = f"Q{i:013d}"
+            self.incidents[incident_id] = {
+                **_reference("incident", incident_id, f"[#{i}] Problem {i}"),
+                "incident_number": i,
+                "title": f"Problem {i}",
+                "description": f"Problem {i}",
+                "created_at": (
+                    now - timedelta(minutes=rng.randrange(10000))
+                ).isoformat(),
+                "status": rng.choice(["triggered", "acknowledged"]),
+                "urgency": rng.choice(["high", "low"]),
+                "service": _reference(
+                    "service", service["id"], service["summary"]
+                ),
+                "teams": service["teams"],
+                "assignments": [
+                    {
+                        "at": now.isoformat(),
+                        "assignee": _reference(
+                            "user", assignee["id"], assignee["summary"]
+                        ),
+                    }
+                ],
+            }
+
+        start = datetime.combine(
+            now.date() - timedelta(days=SCHEDULE_DAYS // 2),
+            time(),
+            timezone.utc,
+        )
+        self.schedules = {}
+        for i in range(schedules):
+            schedule_id = f"PSCH{i:03d}"
+            rotation = [self.users[0]] + rng.sample(
+                self.users[1:], min(5, users - 1)
+            )
+            entries = []
+            shift_start = start
+            for shift in range(
+                int(timedelta(days=SCHEDULE_DAYS) / SHIFT_LENGTH)
+            ):
+                user = rotation[(shift + i) % len(rotation)]
+                entries.append(
+                    {
+                        "start": shift_start.isoformat(),
+                        "end": (shift_start + SHIFT_LENGTH).isoformat(),
+                        "user": _reference(
+                            "user", user["id"], user["summary"]
+                        ),
+                    }
+                )
+                shift_start += SHIFT_LENGTH
+            self.schedules[schedule_id] = {
+                **_reference("schedule", schedule_id, f"Schedule {i}"),
+                "name": f"Schedule {i}",
+                "time_zone": "UTC",
+                "entries": entries,
+            }
+        self.log_entries = []
+
+
+class FakePagerDuty:
+    """An aiohttp server answering PagerDuty API requests for an account."""
+
+    def __init__(self, account, latency=0.0, throttle_every=0, retry_after=1):
+        """Initialize the server.
+
+        latency is added to every response, in seconds. With throttle_every
+        set, every nth request is answered with a 429.
+        """
+        self.account = account
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.requests = Counter()
+        self.throttled = 0
+        self.bytes_sent = 0
+        self.events = []
+        self._count = 0
+        self._runner = None
+        self.app = web.Application(middlewares=[self._middleware])
+        self.app.router.add_get("/users/me", self._user)
+        self.app.router.add_get("/services", self._services)
+        self.app.router.add_get("/services/{id}", self._service)
+        self.app.router.add_post(
+            "/services/{id}/integrations", self._create_integration
+        )
+        self.app.router.add_get(
+            "/services/{id}/integrations/{integration_id}", self._integration
+        )
+        self.app.router.add_get("/incidents", self._incidents)
+        self.app.router.add_put("/incidents", self._update_incidents)
+        self.app.router.add_get("/incidents/{id}", self._incident)
+        self.app.router.add_post("/incidents/{id}/snooze", self._snooze)
+        self.app.router.add_get("/log_entries", self._log_entries)
+        self.app.router.add_get("/oncalls", self._oncalls)
+        self.app.router.add_get("/schedules/{id}", self._schedule)
+        self.app.router.add_post("/v2/enqueue", self._enqueue)
+        self.app.router.add_get(f"{CONTROL_PREFIX}/stats", self._stats)
+        self.app.router.add_post(f"{CONTROL_PREFIX}/touch", self._touch)
+        self._rng = random.Random(0)
+
+    @property
+    def request_count(self):
+        """Return the number of requests served."""
+        return sum(self.requests.values())
+
+    async def start(self, host="127.0.0.1", port=0):
+        """Start serving and return the base URL."""
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{port}"
+
+    async def stop(self):
+        """Stop serving."""
+        await self._runner.cleanup()
+
+    @web.middleware
+    async def _middleware(self, request, handler):
+        """Count requests, add latency and inject 429s."""
+        if request.path.startswith(CONTROL_PREFIX):
+            return await handler(request)
+        route = request.match_info.route.resource
+        self.requests[
+            f"{request.method} {route.canonical if route else request.path}"
+        ] += 1
+        self._count += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.throttle_every and self._count % self.throttle_every == 0:
+            self.throttled += 1
+            return web.json_response(
+                {"error": {"message": "Rate Limit Exceeded", "code": 2020}},
+                status=429,
+                headers={"Retry-After": str(self.retry_after)},
+            )
+        response = await handler(request)
+        self.bytes_sent += len(response.body or b"")
+        return response
+
+    @staticmethod
+    def _json(data, status=200):
+        """Return a JSON response."""
+        return web.Response(
+            body=json.dumps(data).encode(),
+            status=status,
+            content_type="application/json",
+        )
+
+    def _listing(self, request, name, items):
+        """Return a page of a listing."""
+        offset = int(request.query.get("offset", 0))
+        limit = int(request.query.get("limit", 25))
+        body = {
+            name: items[offset : offset + limit],
+            "offset": offset,
+            "limit": limit,
+            "more": offset + limit < len(items),
+            "total": None,
+        }
+        if request.query.get("total") == "true":
+            body["total"] = len(items)
+        return self._json(body)
+
+    async def _user(self, request):
+        return self._json({"user": self.account.users[0]})
+
+    async def _services(self, request):
+        team_ids = set(request.query.getall("team_ids[]", []))
+        services = [
+            service
+            for service in self.account.services
+            if not team_ids or service["teams"][0]["id"] in team_ids
+        ]
+        return self._listing(request, "services", services)
+
+    def _find_service(self, service_id):
+        for service in self.account.services:
+            if service["id"] == service_id:
+                return service
+        raise web.HTTPNotFound()
+
+    async def _service(self, request):
+        return self._json(
+            {"service": self._find_service(request.match_info["id"])}
+        )
+
+    async def _create_integration(self, request):
+        service = self._find_service(request.match_info["id"])
+        body = (await request.json()).get("integration")
+        if not isinstance(body, dict) or not body.get("type"):
+            return self._json(
+                {
+                    "error": {
+                        "message": "Invalid Input Provided",
+                        "errors": ["Integration must be specified."],
+                    }
+                },
+                status=400,
+            )
+        integration = {
+            **_reference(
+                "integration",
+                f"PI{len(service['integrations']):04d}{service['id']}",
+                body.get("name", ""),
+            ),
+            "type": body["type"],
+            "integration_key": f"{service['id']:0<32}"[:32],
+        }
+        service["integrations"].append(integration)
+        return self._json({"integration": integration}, status=201)
+
+    async def _integration(self, request):
+        service = self._find_service(request.match_info["id"])
+        for integration in service["integrations"]:
+            if integration["id"] == request.match_info["integration_id"]:
+                return self._json({"integration": integration})
+        raise web.HTTPNotFound()
+
+    async def _incidents(self, request):
+        service_ids = set(request.query.getall("service_ids[]", []))
+        team_ids = set(request.query.getall("team_ids[]", []))
+        statuses = set(request.query.getall("statuses[]", []))
+        incidents = [
+            incident
+            for incident in self.account.incidents.values()
+            if (not service_ids or incident["service"]["id"] in service_ids)
+            and (
+                not team_ids
+                or any(team["id"] in team_ids for team in incident["teams"])
+            )
+            and (not statuses or incident["status"] in statuses)
+        ]
+        return self._listing(request, "incidents", incidents)
+
+    async def _incident(self, request):
+        incident = self.account.incidents.get(request.match_info["id"])
+        if incident is None:
+            raise web.HTTPNotFound()
+        return self._json({"incident": incident})
+
+    async def _update_incidents(self, request):
+        updated = []
+        for change in (await request.json())["incidents"]:
+            incident = self.account.incidents[change["id"]]
+            if "status" in change:
+                incident["status"] = change["status"]
+            if "assignments" in change:
+                incident["assignments"] = change["assignments"]
+            self._log_change(incident)
+            updated.append(incident)
+        return self._json({"incidents": updated})
+
+    async def _snooze(self, request):
+        incident = self.account.incidents[request.match_info["id"]]
+        self._log_change(incident)
+        return self._json({"incident": incident}, status=201)
+
+    def _log_change(self, incident):
+        """Record a log entry for a changed incident."""
+        self.account.log_entries.append(
+            {
+                "id": f"R{len(self.account.log_entries):013d}",
+                "type": "annotate_log_entry",
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "incident": _reference(
+                    "incident", incident["id"], incident["summary"]
+                ),
+                "service": incident["service"],
+            }
+        )
+
+    async def _log_entries(self, request):
+        since = datetime.fromisoformat(request.query["since"])
+        entries = [
+            entry
+            for entry in self.account.log_entries
+            if datetime.fromisoformat(entry["created_at"]) >= since
+        ]
+        return self._listing(request, "log_entries", entries)
+
+    async def _oncalls(self, request):
+        user_ids = set(request.query.getall("user_ids[]", []))
+        oncalls = [
+            {
+                "user": entry["user"],
+                "schedule": _reference(
+                    "schedule", schedule["id"], schedule["name"]
+                ),
+                "start": entry["start"],
+                "end": entry["end"],
+            }
+            for schedule in self.account.schedules.values()
+            for entry in schedule["entries"][:1]
+            if not user_ids or USER_ID in user_ids
+        ]
+        return self._listing(request, "oncalls", oncalls)
+
+    async def _schedule(self, request):
+        schedule = self.account.schedules.get(request.match_info["id"])
+        if schedule is None:
+            raise web.HTTPNotFound()
+        since = request.query.get("since", "")
+        until = request.query.get("until", "9999")
+        entries = [
+            entry
+            for entry in schedule["entries"]
+            if entry["end"][:10] >= since and entry["start"][:10] < until
+        ]
+        body = {
+            key: value for key, value in schedule.items() if key != "entries"
+        }
+        body["final_schedule"] = {
+            "name": "Final Schedule",
+            "rendered_schedule_entries": entries,
+        }
+        body["schedule_layers"] = []
+        return self._json({"schedule": body})
+
+    async def _stats(self, request):
+        """Return what the server served so far."""
+        return self._json(
+            {
+                "requests": self.request_count,
+                "by_route": self.requests,
+                "throttled": self.throttled,
+                "bytes": self.bytes_sent,
+                "events": len(self.events),
+            }
+        )
+
+    async def _touch(self, request):
+        """Change the status of some incidents and log the changes."""
+        count = int(request.query.get("count", 10))
+        incidents = list(self.account.incidents.values())
+        for incident in self._rng.sample(
+            incidents, min(count, len(incidents))
+        ):
+            incident["status"] = (
+                "acknowledged"
+                if incident["status"] == "triggered"
+                else "triggered"
+            )
+            self._log_change(incident)
+        return self._json({"touched": count})
+
+    async def _enqueue(self, request):
+        event = await request.json()
+        self.events.append(event)
+        return self._json(
+            {
+                "status": "success",
+                "message": "Event processed",
+                "dedup_key": event.get("dedup_key") or str(len(self.events)),
+            },
+            status=202,
+        )
+
+
+def serve(
+    host="127.0.0.1",
+    port=18080,
+    services=2000,
+    incidents=5000,
+    schedules=50,
+    latency=0.0,
+    throttle_every=0,
+):
+    """Generate an account and serve it until interrupted."""
+    server = FakePagerDuty(
+        FakeAccount(services, incidents, schedules),
+        latency=latency,
+        throttle_every=throttle_every,
+    )
+    web.run_app(server.app, host=host, port=port, print=None)
+
+
+def main():
+    """Serve a generated account until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--services", type=int, default=2000)
+    parser.add_argument("--incidents", type=int, default=5000)
+    parser.add_argument("--schedules", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--throttle-every", type=int, default=0)
+    args = parser.parse_args()
+    serve(
+        args.host,
+        args.port,
+        args.services,
+        args.incidents,
+        args.schedules,
+        args.latency,
+        args.throttle_every,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+"""Benchmark the PagerDuty integration against the local API stand-in.
+
+Starts the fake PagerDuty server in its own process, so its work is not
+measured, and prints one JSON document with the results, e.g.:
+
+    python -m benchmarks.run --services 2000 --incidents 5000 --output b.json
+
+Requires Home Assistant to be installed in the environment.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import platform
+import socket
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+import aiohttp
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+from custom_components.pagerduty import sensor
+from custom_components.pagerduty.api import PagerDutyApiClient
+from custom_components.pagerduty.calendar import (
+    CALENDAR_SCHEDULE,
+    CALENDAR_USER,
+    PagerDutyCalendarData,
+)
+from custom_components.pagerduty.const import DOMAIN
+from custom_components.pagerduty.coordinator import (
+    PagerDutyDataUpdateCoordinator,
+)
+from custom_components.pagerduty.index import IncidentIndex
+from .fake_pagerduty import CONTROL_PREFIX, USER_ID, serve
+
+LOOP_PROBE_INTERVAL = 0.005
+SERVER_START_TIMEOUT = 60
+LOOKUP_REPEATS = 1000
+
+
+class LoopMonitor:
+    """Measure how long the event loop is blocked between probes."""
+
+    def __init__(self):
+        """Initialize the monitor."""
+        self.max_blocked = 0.0
+        self.total_blocked = 0.0
+        self._task = None
+
+    def start(self):
+        """Start probing the running loop."""
+        self._task = asyncio.get_running_loop().create_task(self._probe())
+
+    def stop(self):
+        """Stop probing."""
+        self._task.cancel()
+
+    def reset(self):
+        """Forget what was measured so far."""
+        self.max_blocked = 0.0
+        self.total_blocked = 0.0
+
+    async def _probe(self):
+        """Record how late each wakeup is."""
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + LOOP_PROBE_INTERVAL
+            await asyncio.sleep(LOOP_PROBE_INTERVAL)
+            blocked = max(0.0, loop.time() - expected)
+            self.max_blocked = max(self.max_blocked, blocked)
+            self.total_blocked += blocked
+
+
+class FakeServer:
+    """The fake PagerDuty server running in a child process."""
+
+    def __init__(self, args):
+        """Initialize the server settings."""
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._process = multiprocessing.get_context("spawn").Process(
+            target=serve,
+            args=(
+                "127.0.0.1",
+                self.port,
+                args.services,
+                args.incidents,
+                args.schedules,
+                args.latency,
+                args.throttle_every,
+            ),
+            daemon=True,
+        )
+        self._session = None
+
+    async def __aenter__(self):
+        """Start the server and wait until it answers."""
+        self._process.start()
+        self._session = aiohttp.ClientSession()
+        deadline = time.monotonic() + SERVER_START_TIMEOUT
+        while True:
+            try:
+                await self.stats()
+                return self
+            except aiohttp.ClientError:
+                if time.monotonic() > deadline:
+                    raise
+                await asyncio.sleep(0.1)
+
+    async def __aexit__(self, *exc_info):
+        """Stop the server."""
+        await self._session.close()
+        self._process.terminate()
+        self._process.join()
+
+    async def stats(self):
+        """Return the server's counters."""
+        async with self._session.get(
+            f"{self.url}{CONTROL_PREFIX}/stats"
+        ) as response:
+            return await response.json()
+
+    async def touch(self, count):
+        """Change some incidents on the server."""
+        async with self._session.post(
+            f"{self.url}{CONTROL_PREFIX}/touch", params={"count": count}
+        ) as response:
+            response.raise_for_status()
+
+
+async def timed_refresh(coordinator, server, monitor):
+    """Refresh the coordinator and return what it cost."""
+    before = await server.stats()
+    monitor.reset()
+    start = time.perf_counter()
+    await coordinator.async_refresh()
+    wall = time.perf_counter() - start
+    after = await server.stats()
+    if not coordinator.last_update_success:
+        raise RuntimeError(f"Refresh failed: {coordinator.last_exception}")
+    return {
+        "wall_s": round(wall, 4),
+        "requests": after["requests"] - before["requests"],
+        "throttled": after["throttled"] - before["throttled"],
+        "bytes": after["bytes"] - before["bytes"],
+        "loop_blocked_max_ms": round(monitor.max_blocked * 1000, 2),
+        "loop_blocked_total_ms": round(monitor.total_blocked * 1000, 2),
+    }
+
+
+def summarize(samples):
+    """Return the median of every field of a list of measurements."""
+    return {
+        key: round(statistics.median(sample[key] for sample in samples), 4)
+        for key in samples[0]
+    }
+
+
+def time_calls(function, repeats=LOOKUP_REPEATS):
+    """Return the mean duration of a call in microseconds."""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return round((time.perf_counter() - start) / repeats * 1e6, 2)
+
+
+async def bench_sensors(hass, coordinator):
+    """Return the cost of creating and updating the sensors."""
+    hass.data[DOMAIN] = {
+        "benchmark": {
+            "coordinator": coordinator,
+            "metrics": coordinator.metrics,
+        }
+    }
+    entry = SimpleNamespace(
+        entry_id="benchmark", options={}, async_on_unload=lambda _: None
+    )
+    entities = []
+    start = time.perf_counter()
+    await sensor.async_setup_entry(hass, entry, entities.extend)
+    setup = time.perf_counter() - start
+    sensors = [
+        entity
+        for entity in entities
+        if isinstance(entity, sensor.PagerDutySensor)
+    ]
+
+    data = coordinator.data
+    start = time.perf_counter()
+    coordinator.data = {
+        **data,
+        "index": IncidentIndex(data["incidents"], data["services"]),
+    }
+    changed = sum(entity._compute_state() for entity in sensors)
+    update = time.perf_counter() - start
+    return {
+        "entities": len(entities),
+        "setup_ms": round(setup * 1000, 2),
+        "update_ms": round(update * 1000, 2),
+        "changed_on_update": changed,
+    }
+
+
+def bench_calendar(coordinator):
+    """Return the cost of building and querying the calendar events."""
+    calendar = PagerDutyCalendarData(coordinator)
+    start = time.perf_counter()
+    calendar.update_events()
+    build = time.perf_counter() - start
+    index = calendar.index((CALENDAR_USER, USER_ID))
+    now = dt_util.now()
+    return {
+        "events": sum(
+            len(schedule_index.events)
+            for key, schedule_index in calendar.indexes.items()
+            if key[0] == CALENDAR_SCHEDULE
+        ),
+        "build_ms": round(build * 1000, 2),
+        "month_query_us": time_calls(
+            lambda: index.get_events(
+                now - timedelta(days=7), now + timedelta(days=30)
+            )
+        ),
+        "next_event_us": time_calls(lambda: index.next_event(now)),
+    }
+
+
+async def bench_memory(hass, url):
+    """Return the memory a cold refresh allocates and keeps."""
+    coordinator = PagerDutyDataUpdateCoordinator(
+        hass, PagerDutyApiClient(hass, "benchmark-memory", url), ""
+    )
+    tracemalloc.start()
+    await coordinator.async_refresh()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "peak_mb": round(peak / 2**20, 2),
+        "retained_mb": round(retained / 2**20, 2),
+    }
+
+
+async def run(args):
+    """Run every benchmark and return the results."""
+    hass = HomeAssistant(tempfile.mkdtemp())
+    async with FakeServer(args) as server:
+        monitor = LoopMonitor()
+        monitor.start()
+        coordinator = PagerDutyDataUpdateCoordinator(
+            hass, PagerDutyApiClient(hass, "benchmark", server.url), ""
+        )
+        first = await timed_refresh(coordinator, server, monitor)
+        incremental = []
+        for _ in range(args.rounds):
+            await server.touch(args.changes)
+            coordinator.session.clear_shared_responses()
+            incremental.append(
+                await timed_refresh(coordinator, server, monitor)
+            )
+        monitor.stop()
+        results = {
+            "first_refresh": first,
+            "incremental_refresh": summarize(incremental),
+            "sensors": await bench_sensors(hass, coordinator),
+            "calendar": bench_calendar(coordinator),
+            "memory": await bench_memory(hass, server.url),
+            "server": await server.stats(),
+        }
+    await hass.async_stop(force=True)
+    return results
+
+
+def main():
+    """Run the benchmarks and write the results as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--services", type=int, default=2000)
+    parser.add_argument("--incidents", type=int, default=5000)
+    parser.add_argument("--schedules", type=int, default=50)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds per response"
+    )
+    parser.add_argument(
+        "--throttle-every",
+        type=int,
+        default=0,
+        help="Answer every nth request with a 429",
+    )
+    parser.add_argument(
+        "--rounds", type=int, default=5, help="Incremental refreshes to run"
+    )
+    parser.add_argument(
+        "--changes",
+        type=int,
+        default=20,
+        help="Incidents changed before each incremental refresh",
+    )
+    parser.add_argument("--output", help="File to write instead of stdout")
+    args = parser.parse_args()
+
+    document = {
+        "benchmark": "pagerduty",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": vars(args),
+        "results": asyncio.run(run(args)),
+    }
+    output = json.dumps(document, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,24 +1,160 @@
 """The PagerDuty integration for Home Assistant."""
 
 import logging
+import voluptuous as vol
 from homeassistant import config_entries, core
-from homeassistant.core import HomeAssistant
-from homeassistant.const import CONF_API_KEY, Platform, CONF_NAME
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+)
+from homeassistant.const import (
+    CONF_API_KEY,
+    Platform,
+    CONF_NAME,
+    CONF_WEBHOOK_ID,
+)
+from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers import (
     discovery,
     config_validation,
     typing,
 )
 from datetime import timedelta
-from .const import DOMAIN
-from pagerduty import RestApiV2Client
+from .const import (
+    DOMAIN,
+    CONF_SCHEDULE_CONCURRENCY,
+    DEFAULT_SCHEDULE_CONCURRENCY,
+    DATA_CLASSES,
+    SERVICE_REFRESH,
+    SERVICE_ACKNOWLEDGE_INCIDENTS,
+    SERVICE_RESOLVE_INCIDENTS,
+    SERVICE_SNOOZE_INCIDENTS,
+    SERVICE_REASSIGN_INCIDENTS,
+    SERVICE_GET_INCIDENTS,
+    CONF_WEBHOOK_ENABLED,
+    CONF_INCIDENT_STATISTICS,
+    CONF_NOTIFY_COALESCE_WINDOW,
+    DEFAULT_NOTIFY_COALESCE_WINDOW,
+)
+from .api import get_api_client
 from .coordinator import PagerDutyDataUpdateCoordinator
+from .metrics import PagerDutyMetrics
+from .notify import (
+    STORAGE_VERSION,
+    integration_keys_storage_key,
+    notify_spool_storage_key,
+)
+from .snapshot import PagerDutySnapshotStore
+from .webhook import async_register_webhook
 
 _LOGGER = logging.getLogger(__name__)
 
 PLATFORMS = [Platform.SENSOR, Platform.CALENDAR]
 CONFIG_SCHEMA = config_validation.config_entry_only_config_schema(DOMAIN)
 SCAN_INTERVAL = timedelta(seconds=30)
+REFRESH_SCHEMA = vol.Schema(
+    {
+        vol.Optional("data_classes"): vol.All(
+            config_validation.ensure_list, [vol.In(DATA_CLASSES)]
+        ),
+    }
+)
+INCIDENT_FILTERS = (
+    "incident_ids",
+    "service_ids",
+    "team_ids",
+    "urgency",
+    "assigned_to_me",
+)
+INCIDENT_ID_LIST = vol.All(
+    config_validation.ensure_list,
+    [config_validation.string],
+    vol.Length(min=1),
+)
+INCIDENT_FILTER_FIELDS = {
+    vol.Optional("incident_ids"): INCIDENT_ID_LIST,
+    vol.Optional("service_ids"): INCIDENT_ID_LIST,
+    vol.Optional("team_ids"): INCIDENT_ID_LIST,
+    vol.Optional("urgency"): vol.In(["high", "low"]),
+    vol.Optional("assigned_to_me"): config_validation.boolean,
+}
+
+
+def _drop_unset_filters(data):
+    """Drop filters that do not narrow the selection down."""
+    if data.get("assigned_to_me") is False:
+        data = {**data}
+        del data["assigned_to_me"]
+    return data
+
+
+GET_INCIDENTS_SCHEMA = vol.All(
+    vol.Schema(INCIDENT_FILTER_FIELDS), _drop_unset_filters
+)
+REQUIRE_INCIDENT_FILTER = vol.All(
+    _drop_unset_filters,
+    config_validation.has_at_least_one_key(*INCIDENT_FILTERS),
+)
+INCIDENT_ACTION_SCHEMAS = {
+    SERVICE_ACKNOWLEDGE_INCIDENTS: vol.All(
+        vol.Schema(INCIDENT_FILTER_FIELDS), REQUIRE_INCIDENT_FILTER
+    ),
+    SERVICE_RESOLVE_INCIDENTS: vol.All(
+        vol.Schema(INCIDENT_FILTER_FIELDS), REQUIRE_INCIDENT_FILTER
+    ),
+    SERVICE_SNOOZE_INCIDENTS: vol.All(
+        vol.Schema(
+            {
+                **INCIDENT_FILTER_FIELDS,
+                vol.Required(
+                    "duration"
+                ): config_validation.positive_time_period,
+            }
+        ),
+        REQUIRE_INCIDENT_FILTER,
+    ),
+    SERVICE_REASSIGN_INCIDENTS: vol.All(
+        vol.Schema(
+            {
+                **INCIDENT_FILTER_FIELDS,
+                vol.Exclusive("user_ids", "assignee"): vol.All(
+                    config_validation.ensure_list, [config_validation.string]
+                ),
+                vol.Exclusive(
+                    "escalation_policy_id", "assignee"
+                ): config_validation.string,
+            }
+        ),
+        REQUIRE_INCIDENT_FILTER,
+        config_validation.has_at_least_one_key(
+            "user_ids", "escalation_policy_id"
+        ),
+    ),
+}
+
+
+def _incident_changes(call):
+    """Return the incident fields an incident action call changes."""
+    if call.service == SERVICE_ACKNOWLEDGE_INCIDENTS:
+        return {"status": "acknowledged"}
+    if call.service == SERVICE_RESOLVE_INCIDENTS:
+        return {"status": "resolved"}
+    if "escalation_policy_id" in call.data:
+        return {
+            "escalation_policy": {
+                "id": call.data["escalation_policy_id"],
+                "type": "escalation_policy_reference",
+            }
+        }
+    return {
+        "assignments": [
+            {"assignee": {"id": user_id, "type": "user_reference"}}
+            for user_id in call.data["user_ids"]
+        ]
+    }
 
 
 async def async_setup(hass: HomeAssistant, config: typing.ConfigType) -> bool:
@@ -26,6 +162,103 @@ async def async_setup(hass: HomeAssistant, config: typing.ConfigType) -> bool:
     _LOGGER.debug("Setting up PagerDuty integration")
     _LOGGER.debug(f"Configuration data: {config}")
 
+    async def async_handle_refresh(call: ServiceCall) -> None:
+        """Force a refresh of every configured PagerDuty entry."""
+        for entry in hass.config_entries.async_entries(DOMAIN):
+            entry_data = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+            if entry_data:
+                await entry_data["coordinator"].async_force_refresh(
+                    call.data.get("data_classes")
+                )
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_REFRESH, async_handle_refresh, schema=REFRESH_SCHEMA
+    )
+
+    async def async_handle_incident_action(
+        call: ServiceCall,
+    ) -> ServiceResponse:
+        """Update the cached incidents matching the call's filters.
+
+        Entries on the same PagerDuty account see the same incidents, so
+        each incident is only updated through the first entry matching it.
+        """
+        filters = {
+            key: call.data[key] for key in INCIDENT_FILTERS if key in call.data
+        }
+        if call.service == SERVICE_SNOOZE_INCIDENTS:
+            filters["status"] = "acknowledged"
+        handled = set()
+        updated = []
+        failed = []
+        for entry in hass.config_entries.async_entries(DOMAIN):
+            entry_data = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+            if not entry_data:
+                continue
+            coordinator = entry_data["coordinator"]
+            account = coordinator.session.account
+            incident_ids = [
+                incident_id
+                for incident_id in coordinator.select_incidents(**filters)
+                if (account, incident_id) not in handled
+            ]
+            handled.update(
+                (account, incident_id) for incident_id in incident_ids
+            )
+            _LOGGER.debug(f"{call.service} matched incidents {incident_ids}")
+            if not incident_ids:
+                continue
+            if call.service == SERVICE_SNOOZE_INCIDENTS:
+                result = await coordinator.async_snooze_incidents(
+                    incident_ids, int(call.data["duration"].total_seconds())
+                )
+            else:
+                result = await coordinator.async_update_incidents(
+                    incident_ids, _incident_changes(call)
+                )
+            updated.extend(result[0])
+            failed.extend(result[1])
+        return {"updated": updated, "failed": failed}
+
+    for service, schema in INCIDENT_ACTION_SCHEMAS.items():
+        hass.services.async_register(
+            DOMAIN,
+            service,
+            async_handle_incident_action,
+            schema=schema,
+            supports_response=SupportsResponse.OPTIONAL,
+        )
+
+    async def async_handle_get_incidents(
+        call: ServiceCall,
+    ) -> ServiceResponse:
+        """Return the details of the cached incidents matching the filters.
+
+        Entries on the same PagerDuty account see the same incidents, so
+        each incident is only returned once.
+        """
+        seen = set()
+        incidents = []
+        for entry in hass.config_entries.async_entries(DOMAIN):
+            entry_data = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+            if not entry_data:
+                continue
+            coordinator = entry_data["coordinator"]
+            account = coordinator.session.account
+            for incident in coordinator.filter_incidents(**call.data):
+                if (account, incident.id) not in seen:
+                    seen.add((account, incident.id))
+                    incidents.append(incident.to_dict())
+        return {"incidents": incidents}
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_INCIDENTS,
+        async_handle_get_incidents,
+        schema=GET_INCIDENTS_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+
     if DOMAIN not in config:
         return True
 
@@ -50,23 +283,51 @@ async def async_setup_entry(
     api_key = entry.data[CONF_API_KEY]
     ignored_team_ids = entry.data.get("ignored_team_ids", "")
     api_base_url = entry.data.get("api_base_url")
-    session = RestApiV2Client(api_key)
-    session.url = api_base_url
+    schedule_concurrency = entry.data.get(
+        CONF_SCHEDULE_CONCURRENCY, DEFAULT_SCHEDULE_CONCURRENCY
+    )
+    metrics = PagerDutyMetrics()
+    session = get_api_client(hass, api_key, api_base_url, metrics)
 
     _LOGGER.debug(f"Ignored team IDs: {ignored_team_ids}")
     _LOGGER.debug(f"API base URL: {api_base_url}")
 
     coordinator = PagerDutyDataUpdateCoordinator(
-        hass, session, ignored_team_ids
+        hass,
+        session,
+        ignored_team_ids,
+        schedule_concurrency,
+        metrics,
+        entry.entry_id,
+        entry.options.get(CONF_INCIDENT_STATISTICS, False),
     )
 
-    await coordinator.async_first_config_entry()
+    if await coordinator.async_restore_snapshot():
+        _LOGGER.debug("Restored PagerDuty snapshot, refreshing in background")
+        entry.async_create_background_task(
+            hass,
+            coordinator.async_refresh(),
+            f"{DOMAIN}_initial_refresh_{entry.entry_id}",
+        )
+    else:
+        await coordinator.async_first_config_entry()
+        if coordinator.data is None:
+            raise ConfigEntryNotReady("Initial PagerDuty data update failed")
 
     hass.data.setdefault(DOMAIN, {})[entry.entry_id] = {
         "coordinator": coordinator,
         "session": session,
+        "metrics": metrics,
     }
 
+    if entry.options.get(CONF_WEBHOOK_ENABLED) and entry.options.get(
+        CONF_WEBHOOK_ID
+    ):
+        async_register_webhook(hass, entry)
+        coordinator.push_enabled = True
+
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
     hass.async_create_task(
@@ -78,9 +339,47 @@ async def async_setup_entry(
                 CONF_NAME: DOMAIN,
                 CONF_API_KEY: api_key,
                 "api_base_url": api_base_url,
+                "entry_id": entry.entry_id,
+                CONF_NOTIFY_COALESCE_WINDOW: entry.options.get(
+                    CONF_NOTIFY_COALESCE_WINDOW, DEFAULT_NOTIFY_COALESCE_WINDOW
+                ),
             },
             entry.data,
         )
     )
 
     return True
+
+
+async def async_unload_entry(
+    hass: core.HomeAssistant, entry: config_entries.ConfigEntry
+) -> bool:
+    """Unload a PagerDuty config entry."""
+    unload_ok = await hass.config_entries.async_unload_platforms(
+        entry, PLATFORMS
+    )
+    if unload_ok:
+        entry_data = hass.data[DOMAIN].pop(entry.entry_id, {})
+        if "notifier" in entry_data:
+            await entry_data["notifier"].async_stop()
+    return unload_ok
+
+
+async def async_reload_entry(
+    hass: core.HomeAssistant, entry: config_entries.ConfigEntry
+) -> None:
+    """Reload a config entry after its options changed."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
+async def async_remove_entry(
+    hass: core.HomeAssistant, entry: config_entries.ConfigEntry
+) -> None:
+    """Remove the stored data of a deleted config entry."""
+    await PagerDutySnapshotStore(hass, entry.entry_id).async_remove()
+    await Store(
+        hass, STORAGE_VERSION, integration_keys_storage_key(entry.entry_id)
+    ).async_remove()
+    await Store(
+        hass, STORAGE_VERSION, notify_spool_storage_key(entry.entry_id)
+    ).async_remove()
@@ -0,0 +1,581 @@
+"""Async clients for the PagerDuty REST and Events APIs."""
+
+import asyncio
+import logging
+import time
+from urllib.parse import urlparse
+from aiohttp import ClientError, ClientTimeout
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_API_BASE_URL = "https://api.pagerduty.com"
+DEFAULT_EVENTS_BASE_URL = "https://events.pagerduty.com"
+EU_EVENTS_BASE_URL = "https://events.eu.pagerduty.com"
+PAGE_LIMIT = 100
+PAGE_CONCURRENCY = 4
+REQUEST_TIMEOUT = ClientTimeout(total=30)
+DEFAULT_RATE_LIMIT = 900
+DEFAULT_RATE_LIMIT_WINDOW = 60
+MIN_REQUEST_RATE = 0.1
+RATE_LIMIT_BURST = 30
+RATE_LIMIT_RETRIES = 2
+DEFAULT_RETRY_AFTER = 30
+SHARED_RESPONSE_TTL = 10
+USER_SPECIFIC_PATHS = ("users/me",)
+
+
+class PagerDutyApiError(Exception):
+    """Error raised when a PagerDuty API request fails."""
+
+    def __init__(self, message, status=None):
+        """Initialize the error with the HTTP status, if there was one."""
+        super().__init__(message)
+        self.status = status
+
+
+def events_base_url_for(api_base_url):
+    """Return the Events API base URL matching a REST API base URL."""
+    if not api_base_url or api_base_url == DEFAULT_API_BASE_URL:
+        return DEFAULT_EVENTS_BASE_URL
+    return EU_EVENTS_BASE_URL
+
+
+async def gather_bounded(limit, awaitables):
+    """Await awaitables with at most limit running, returning exceptions."""
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run(awaitable):
+        async with semaphore:
+            return await awaitable
+
+    return await asyncio.gather(
+        *(run(awaitable) for awaitable in awaitables), return_exceptions=True
+    )
+
+
+def _header_number(headers, name):
+    """Return a numeric response header, or None if missing or malformed."""
+    try:
+        return float(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """Token bucket paced by PagerDuty's rate limit response headers.
+
+    All clients using the same API key share one limiter. The refill rate
+    starts at the documented per-key limit and is then set from the
+    ratelimit-remaining and ratelimit-reset headers, so the remaining budget
+    is spread over the rest of the window, including requests made by other
+    installations sharing the key. A 429 blocks all requests until its
+    Retry-After has passed.
+    """
+
+    def __init__(self):
+        """Initialize the limiter with a full bucket."""
+        self.rate = DEFAULT_RATE_LIMIT / DEFAULT_RATE_LIMIT_WINDOW
+        self.tokens = RATE_LIMIT_BURST
+        self.blocked_until = 0
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now):
+        """Add the tokens earned since the last refill."""
+        self.tokens = min(
+            RATE_LIMIT_BURST, self.tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    async def acquire(self):
+        """Wait until a request may be sent."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self.blocked_until - now
+                if wait <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+                _LOGGER.debug(f"Rate limited, waiting {wait:.2f}s")
+                await asyncio.sleep(wait)
+
+    def update(self, headers):
+        """Adjust the pace from a response's rate limit headers."""
+        remaining = _header_number(headers, "ratelimit-remaining")
+        reset = _header_number(headers, "ratelimit-reset")
+        if remaining is None:
+            return
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens = min(self.tokens, remaining)
+        if reset and reset > 0:
+            self.rate = max(MIN_REQUEST_RATE, remaining / reset)
+            if remaining < 1:
+                self.blocked_until = max(self.blocked_until, now + reset)
+
+    def block(self, headers):
+        """Stop all requests after a 429 response."""
+        retry_after = (
+            _header_number(headers, "retry-after")
+            or _header_number(headers, "ratelimit-reset")
+            or DEFAULT_RETRY_AFTER
+        )
+        self.tokens = 0
+        self.blocked_until = max(
+            self.blocked_until, time.monotonic() + retry_after
+        )
+        _LOGGER.warning(
+            f"PagerDuty rate limit reached, pausing requests for {retry_after:.0f}s"
+        )
+
+
+def _rate_limiter(hass, api_key):
+    """Return the rate limiter shared by every client using an API key."""
+    limiters = hass.data.setdefault(DOMAIN, {}).setdefault("rate_limiters", {})
+    if api_key not in limiters:
+        limiters[api_key] = RateLimiter()
+    return limiters[api_key]
+
+
+class SharedResponses:
+    """GET responses shared by every client of a PagerDuty account.
+
+    Identical GETs made while one is in flight wait for its response
+    instead of being sent again, and responses are reused for
+    SHARED_RESPONSE_TTL seconds. A client asks only for responses sent
+    after its own last sync, so it never gets a response back from before
+    changes it already synced, however soon it refreshes again.
+    """
+
+    def __init__(self):
+        """Initialize an empty cache."""
+        self._responses = {}
+        self._pending = {}
+
+    async def async_get(self, key, fetch, sent_after=None):
+        """Return the shared response for a key, fetching it if needed.
+
+        Only responses whose request was sent after sent_after, a monotonic
+        time, are shared. Returns the response and whether it was shared.
+        """
+        now = time.monotonic()
+        cached = self._responses.get(key)
+        if cached is not None and self._usable(cached[0], now, sent_after):
+            return cached[1], True
+        pending = self._pending.get(key)
+        if pending is not None and self._usable(pending[0], now, sent_after):
+            return await asyncio.shield(pending[1]), True
+        task = asyncio.ensure_future(self._async_fetch(key, fetch, now))
+        self._pending[key] = (now, task)
+        return await asyncio.shield(task), False
+
+    @staticmethod
+    def _usable(sent_at, now, sent_after):
+        """Return whether a response sent at a time may be shared now."""
+        return now < sent_at + SHARED_RESPONSE_TTL and (
+            sent_after is None or sent_at > sent_after
+        )
+
+    async def _async_fetch(self, key, fetch, sent_at):
+        """Fetch a response and keep it for the other clients."""
+        try:
+            body = await fetch()
+        finally:
+            pending = self._pending.get(key)
+            if pending is not None and pending[1] is asyncio.current_task():
+                del self._pending[key]
+        now = time.monotonic()
+        for expired in [
+            cached_key
+            for cached_key, cached in self._responses.items()
+            if cached[0] + SHARED_RESPONSE_TTL <= now
+        ]:
+            del self._responses[expired]
+        cached = self._responses.get(key)
+        if cached is None or cached[0] < sent_at:
+            self._responses[key] = (sent_at, body)
+        return body
+
+    def clear(self):
+        """Drop every cached response."""
+        self._responses.clear()
+
+
+def _shared_responses(hass, scope):
+    """Return the responses shared within a scope."""
+    shared = hass.data.setdefault(DOMAIN, {}).setdefault(
+        "shared_responses", {}
+    )
+    if scope not in shared:
+        shared[scope] = SharedResponses()
+    return shared[scope]
+
+
+def get_api_client(hass, api_key, api_base_url=None, metrics=None):
+    """Return a REST API client counting into the caller's metrics.
+
+    Clients of the same API key share their rate limiter, GET responses
+    and account, so each config entry or notifier gets its own client
+    without its counters landing in another's metrics.
+    """
+    return PagerDutyApiClient(hass, api_key, api_base_url, metrics)
+
+
+def account_from_url(html_url):
+    """Return the account host of a PagerDuty web URL, e.g. a user's."""
+    return urlparse(html_url or "").hostname
+
+
+def _encode_params(params):
+    """Flatten request params into the query format PagerDuty expects."""
+    if not params:
+        return None
+    encoded = []
+    for key, value in params.items():
+        if isinstance(value, (list, tuple, set)):
+            if not key.endswith("[]"):
+                key = f"{key}[]"
+            encoded.extend((key, str(item)) for item in value)
+        elif isinstance(value, bool):
+            encoded.append((key, "true" if value else "false"))
+        elif value is not None:
+            encoded.append((key, str(value)))
+    return encoded
+
+
+def _singular(name):
+    """Return the singular form of a PagerDuty resource name."""
+    if name.endswith("ies"):
+        return f"{name[:-3]}y"
+    if name.endswith("s"):
+        return name[:-1]
+    return name
+
+
+def _unwrap(path, body):
+    """Return the resource wrapped in a PagerDuty response envelope."""
+    if not isinstance(body, dict):
+        return body
+    segments = [segment for segment in path.split("/") if segment]
+    if not segments:
+        return body
+    candidates = [segments[-1], _singular(segments[-1])]
+    if len(segments) > 1:
+        candidates.append(_singular(segments[-2]))
+    if len(segments) > 2:
+        candidates.append(_singular(segments[-3]))
+    for key in candidates:
+        if key in body:
+            return body[key]
+    return body
+
+
+class PagerDutyApiClient:
+    """Async PagerDuty REST API v2 client using the shared HTTP session."""
+
+    def __init__(self, hass, api_key, api_base_url=None, metrics=None):
+        """Initialize the client.
+
+        When given metrics, requests, pages, bytes, retries and 429s are
+        counted per endpoint.
+        """
+        self.api_key = api_key
+        self.metrics = metrics
+        self.url = (api_base_url or DEFAULT_API_BASE_URL).rstrip("/")
+        self._session = async_get_clientsession(hass)
+        self.rate_limiter = _rate_limiter(hass, api_key)
+        self._hass = hass
+        self._key = (self.url, api_key)
+        self._synced_at = None
+        self._key_responses = _shared_responses(hass, self._key)
+        self._accounts = hass.data.setdefault(DOMAIN, {}).setdefault(
+            "accounts", {}
+        )
+        self._headers = {
+            "Authorization": f"Token token={api_key}",
+            "Accept": "application/vnd.pagerduty+json;version=2",
+            "Content-Type": "application/json",
+        }
+
+    def mark_synced(self):
+        """Stop sharing responses to requests sent before now.
+
+        Called after each sync, so the next one sees changes made since,
+        even when it follows right away.
+        """
+        self._synced_at = time.monotonic()
+
+    def set_account(self, account):
+        """Share GET responses with other clients of the same account.
+
+        Responses of user-specific paths stay shared only between clients
+        using the same API key.
+        """
+        if account:
+            self._accounts[self._key] = account
+
+    @property
+    def account(self):
+        """Return the account of the API key, once known."""
+        return self._accounts.get(self._key)
+
+    @property
+    def _account_responses(self):
+        """Return the responses shared within the account, once known."""
+        account = self.account
+        if account is None:
+            return None
+        return _shared_responses(self._hass, (self.url, account))
+
+    def clear_shared_responses(self):
+        """Drop the shared responses this client would reuse."""
+        self._key_responses.clear()
+        account_responses = self._account_responses
+        if account_responses is not None:
+            account_responses.clear()
+
+    async def request(
+        self, method, path, params=None, json=None, headers=None
+    ):
+        """Send a request and return the decoded JSON body.
+
+        GETs are coalesced with and reused from identical GETs of other
+        clients, while other methods drop the shared responses.
+        """
+        if method != "GET" or headers:
+            try:
+                return await self._send(method, path, params, json, headers)
+            finally:
+                self.clear_shared_responses()
+        path = path.strip("/")
+        responses = self._key_responses
+        account_responses = self._account_responses
+        if account_responses is not None and not path.startswith(
+            USER_SPECIFIC_PATHS
+        ):
+            responses = account_responses
+        body, shared = await responses.async_get(
+            (path, tuple(_encode_params(params) or ())),
+            lambda: self._send(method, path, params),
+            self._synced_at,
+        )
+        if shared:
+            self._count(method, path, shared=1)
+        return body
+
+    async def _send(self, method, path, params=None, json=None, headers=None):
+        """Send a request and return the decoded JSON body."""
+        url = f"{self.url}/{path.lstrip('/')}"
+        headers = {**self._headers, **(headers or {})}
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            await self.rate_limiter.acquire()
+            try:
+                async with self._session.request(
+                    method,
+                    url,
+                    headers=headers,
+                    params=_encode_params(params),
+                    json=json,
+                    timeout=REQUEST_TIMEOUT,
+                ) as response:
+                    self.rate_limiter.update(response.headers)
+                    throttled = response.status == 429
+                    retry = throttled and attempt < RATE_LIMIT_RETRIES
+                    self._count(
+                        method,
+                        path,
+                        requests=1,
+                        throttled=int(throttled),
+                        retries=int(retry),
+                    )
+                    if retry:
+                        self.rate_limiter.block(response.headers)
+                        continue
+                    return await self._handle_response(method, path, response)
+            except (ClientError, asyncio.TimeoutError) as err:
+                raise PagerDutyApiError(
+                    f"{method} {path} failed: {err}"
+                ) from err
+
+    async def _handle_response(self, method, path, response):
+        """Return the decoded body of a response, raising on errors."""
+        self._count(method, path, bytes=len(await response.read()))
+        if response.status == 429:
+            self.rate_limiter.block(response.headers)
+        if response.status >= 400:
+            text = await response.text()
+            raise PagerDutyApiError(
+                f"{method} {path} failed with HTTP {response.status}: {text}",
+                response.status,
+            )
+        if response.status == 204:
+            return None
+        return await response.json(content_type=None)
+
+    async def rget(self, path, params=None):
+        """GET a resource and return it without its envelope."""
+        return _unwrap(path, await self.request("GET", path, params=params))
+
+    async def rpost(self, path, json=None, headers=None):
+        """POST to a resource and return the result without its envelope."""
+        return _unwrap(
+            path,
+            await self.request("POST", path, json=json, headers=headers),
+        )
+
+    async def rput(self, path, json=None, headers=None):
+        """PUT to a resource and return the result without its envelope."""
+        return _unwrap(
+            path, await self.request("PUT", path, json=json, headers=headers)
+        )
+
+    async def list_all(self, path, params=None, transform=None):
+        """Return every item of a paginated collection.
+
+        The first page is requested with total=true, then the remaining
+        offsets are fetched concurrently, at most PAGE_CONCURRENCY at a time.
+        Items are returned in listing order, without duplicate IDs from
+        items shifting between pages while they were fetched. When given,
+        transform is applied to each item as its page arrives, so the raw
+        page can be dropped right away.
+        """
+        wrapper = [segment for segment in path.split("/") if segment][-1]
+        params = {**(params or {}), "limit": PAGE_LIMIT, "total": True}
+        first = await self.request("GET", path, params={**params, "offset": 0})
+        self._count("GET", path, pages=1)
+        page_size = len(first.get(wrapper, []))
+        items = _transform_page(first.get(wrapper, []), transform)
+        if not first.get("more") or not items:
+            return items
+
+        total = first.get("total")
+        offset = page_size
+        if total is not None and total > offset:
+            offsets = list(range(offset, total, page_size))
+            pages = await gather_bounded(
+                PAGE_CONCURRENCY,
+                [
+                    self._request_page(
+                        path,
+                        {**params, "offset": page_offset},
+                        wrapper,
+                        transform,
+                    )
+                    for page_offset in offsets
+                ],
+            )
+            for page in pages:
+                if isinstance(page, Exception):
+                    raise page
+                items.extend(page[0])
+            last_count, last_more = pages[-1][1:]
+            offset = offsets[-1] + last_count
+            if not last_more:
+                return _unique_items(items)
+
+        while True:
+            page, count, more = await self._request_page(
+                path, {**params, "offset": offset}, wrapper, transform
+            )
+            items.extend(page)
+            if not more or not count:
+                return _unique_items(items)
+            offset += count
+
+    async def _request_page(self, path, params, wrapper, transform):
+        """Return a page's transformed items, raw item count and more flag."""
+        body = await self.request("GET", path, params=params)
+        self._count("GET", path, pages=1)
+        page = body.get(wrapper, [])
+        return _transform_page(page, transform), len(page), body.get("more")
+
+    def _count(self, method, path, **counts):
+        """Add to the request counters of the endpoint of a path."""
+        if self.metrics is not None:
+            self.metrics.count_request(_endpoint(method, path), **counts)
+
+
+def _endpoint(method, path):
+    """Return the endpoint of a request, with resource IDs left out."""
+    segments = [segment for segment in path.split("/") if segment]
+    return f"{method} /" + "/".join(
+        segment if index % 2 == 0 or segment == "me" else "{id}"
+        for index, segment in enumerate(segments)
+    )
+
+
+def _transform_page(page, transform):
+    """Apply a transform to every item of a page."""
+    if transform is None:
+        return list(page)
+    return [transform(item) for item in page]
+
+
+def _unique_items(items):
+    """Drop repeated items with the same ID, keeping the first one."""
+    seen = set()
+    unique = []
+    for item in items:
+        if isinstance(item, dict):
+            item_id = item.get("id")
+        else:
+            item_id = getattr(item, "id", None)
+        if item_id is not None:
+            if item_id in seen:
+                continue
+            seen.add(item_id)
+        unique.append(item)
+    return unique
+
+
+class PagerDutyEventsClient:
+    """Async PagerDuty Events API v2 client for a single routing key."""
+
+    def __init__(self, hass, routing_key, events_base_url=None):
+        """Initialize the client."""
+        self.routing_key = routing_key
+        self.url = (events_base_url or DEFAULT_EVENTS_BASE_URL).rstrip("/")
+        self._session = async_get_clientsession(hass)
+
+    async def send_event(self, event_action, payload=None, dedup_key=None):
+        """Send an event and return the dedup key PagerDuty assigned."""
+        event = {"routing_key": self.routing_key, "event_action": event_action}
+        if payload is not None:
+            event["payload"] = payload
+        if dedup_key:
+            event["dedup_key"] = dedup_key
+        try:
+            async with self._session.post(
+                f"{self.url}/v2/enqueue", json=event, timeout=REQUEST_TIMEOUT
+            ) as response:
+                if response.status >= 400:
+                    text = await response.text()
+                    raise PagerDutyApiError(
+                        f"Events API rejected {event_action} with HTTP {response.status}: {text}",
+                        response.status,
+                    )
+                body = await response.json(content_type=None)
+        except (ClientError, asyncio.TimeoutError) as err:
+            raise PagerDutyApiError(
+                f"Events API request failed: {err}"
+            ) from err
+        return body.get("dedup_key")
+
+    async def trigger(
+        self,
+        summary,
+        source,
+        severity="critical",
+        dedup_key=None,
+        custom_details=None,
+    ):
+        """Trigger an alert and return its dedup key."""
+        payload = {"summary": summary, "source": source, "severity": severity}
+        if custom_details:
+            payload["custom_details"] = custom_details
+        return await self.send_event("trigger", payload, dedup_key)
@@ -1,97 +1,224 @@
 import logging
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from itertools import accumulate
 from homeassistant.components.calendar import CalendarEntity, CalendarEvent
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.util import dt as dt_util
-from .const import DOMAIN
+from .const import DOMAIN, CONF_TEAM_CALENDARS
 
 _LOGGER = logging.getLogger(__name__)
 
+CALENDAR_USER = "user"
+CALENDAR_SCHEDULE = "schedule"
+
+
+class CalendarEventIndex:
+    """Calendar events sorted by start for range and next event lookups.
+
+    A running maximum of the event ends is kept next to the starts, so both
+    lookups are answered by bisection instead of scanning every event.
+    """
+
+    def __init__(self, events):
+        """Build the index."""
+        self.events = sorted(events, key=lambda event: event.start)
+        self._starts = [event.start for event in self.events]
+        self._max_ends = list(
+            accumulate((event.end for event in self.events), max)
+        )
+
+    def get_events(self, start_date, end_date):
+        """Return events overlapping the given range, ordered by start."""
+        first = bisect_left(self._max_ends, start_date)
+        last = bisect_right(self._starts, end_date)
+        return [
+            event
+            for event in self.events[first:last]
+            if event.end >= start_date
+        ]
+
+    def next_event(self, now):
+        """Return the current or next upcoming event."""
+        for index in range(
+            bisect_right(self._max_ends, now), len(self.events)
+        ):
+            if self.events[index].end > now:
+                return self.events[index]
+        return None
+
+
+EMPTY_INDEX = CalendarEventIndex([])
+
 
 class PagerDutyCalendarData:
-    """Class to handle the fetching and processing of PagerDuty events."""
+    """Calendar events of the PagerDuty schedules, shared by all calendars.
+
+    Every schedule entry becomes one event, indexed by user and by schedule
+    in a single pass. The polled schedules are indexed once per set of
+    schedules; ranges outside the polled window are rendered on demand and
+    the last such window is kept for the other calendars.
+    """
 
-    def __init__(self, coordinator, user_id):
+    def __init__(self, coordinator):
         """Initialize the data object."""
         self.coordinator = coordinator
-        self.user_id = user_id
-        self.events = []
-
-    async def fetch_all_events(self):
-        """Fetch all events from the coordinator data."""
-        self.events.clear()
-        new_schedules = self.coordinator.data.get("on_call_schedules", [])
-        for schedule_details in new_schedules:
-            self._process_schedule(schedule_details)
-        return self.events
-
-    def _process_schedule(self, schedule_details):
-        """Process each schedule to extract events."""
-        schedule_entries = schedule_details.get("final_schedule", {}).get(
-            "rendered_schedule_entries"
-        ) or schedule_details.get("schedule_layers", [{}])[0].get(
-            "rendered_schedule_entries", []
+        self.indexes = {}
+        self.user_names = {}
+        self.schedule_names = {}
+        self.version = 0
+        self._schedules = None
+        self._window = None
+
+    def update_events(self):
+        """Rebuild the events if the coordinator's schedules changed.
+
+        Returns whether the events were rebuilt.
+        """
+        schedules = (self.coordinator.data or {}).get("on_call_schedules", [])
+        if schedules is self._schedules:
+            return False
+        self._schedules = schedules
+        self.indexes = self.build_indexes(schedules)
+        self.schedule_names = {
+            schedule.id: schedule.name for schedule in schedules
+        }
+        self.user_names = {
+            entry.user_id: entry.user_summary
+            for schedule in schedules
+            for entry in schedule.entries
+            if entry.user_id
+        }
+        self.version += 1
+        _LOGGER.debug(f"Built calendar events of {len(schedules)} schedules")
+        return True
+
+    def build_indexes(self, schedules):
+        """Return event indexes keyed by calendar kind and ID."""
+        events = defaultdict(list)
+        for schedule in schedules:
+            for entry in schedule.entries:
+                event = self._create_event(entry, schedule)
+                events[(CALENDAR_SCHEDULE, schedule.id)].append(event)
+                if entry.user_id:
+                    events[(CALENDAR_USER, entry.user_id)].append(event)
+        return {
+            key: CalendarEventIndex(items) for key, items in events.items()
+        }
+
+    def index(self, key):
+        """Return the index of the polled events for a calendar key."""
+        return self.indexes.get(key, EMPTY_INDEX)
+
+    async def async_get_events(self, key, start_date, end_date):
+        """Return a calendar's events between start_date and end_date."""
+        if self.coordinator.schedules_cover(start_date, end_date):
+            return self.index(key).get_events(start_date, end_date)
+        schedules = await self.coordinator.async_get_schedules_between(
+            start_date, end_date
         )
-        for entry in schedule_entries:
-            if entry.get("user", {}).get("id") == self.user_id:
-                self._add_event(entry, schedule_details)
-
-    def _add_event(self, entry, schedule_details):
-        """Add an event to the events list."""
-        start = self._parse_datetime(entry.get("start"))
-        end = self._parse_datetime(entry.get("end"))
-        event = self._create_event(entry, schedule_details, start, end)
-        self.events.append(event)
-
-    def _create_event(self, entry, schedule_details, start, end):
-        """Create a new CalendarEvent from a schedule entry."""
-        unique_id_part = self._get_unique_id_part(
-            entry, schedule_details["id"]
+        if self._window is None or not _same_items(self._window[0], schedules):
+            self._window = (schedules, self.build_indexes(schedules))
+        return (
+            self._window[1]
+            .get(key, EMPTY_INDEX)
+            .get_events(start_date, end_date)
         )
-        uid = f"{schedule_details['id']}-{unique_id_part}"
+
+    @staticmethod
+    def _create_event(entry, schedule):
+        """Create a new CalendarEvent from a schedule entry."""
+        uid = f"{schedule.id}-{PagerDutyCalendarData._get_unique_id_part(entry, schedule.id)}"
         return CalendarEvent(
-            summary=schedule_details["name"],
-            start=start,
-            end=end,
-            location=entry["user"]["summary"],
-            description=f"Schedule ID: {schedule_details['id']}",
+            summary=schedule.name,
+            start=entry.start,
+            end=entry.end,
+            location=entry.user_summary,
+            description=f"Schedule ID: {schedule.id}",
             uid=uid,
         )
 
     @staticmethod
     def _get_unique_id_part(entry, schedule_id):
         """Generate a unique part of an ID for each entry."""
-        entry_date = PagerDutyCalendarData._parse_datetime(
-            entry.get("start")
-        ).date()
-        return f"{schedule_id}-{entry_date}"
+        return f"{schedule_id}-{entry.user_id}-{entry.start.isoformat()}"
 
-    @staticmethod
-    def _parse_datetime(date_str):
-        """Parse datetime string to a datetime object."""
-        if not date_str:
-            return None
-        return dt_util.parse_datetime(date_str)
+
+def _same_items(first, second):
+    """Return whether two lists hold the same objects."""
+    return len(first) == len(second) and all(
+        a is b for a, b in zip(first, second)
+    )
 
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Set up the calendar entry."""
     coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
     user_id = coordinator.data.get("user_id", "")
-    async_add_entities([PagerDutyCalendar(coordinator, user_id)], True)
-
-
-class PagerDutyCalendar(CalendarEntity):
+    calendar_data = PagerDutyCalendarData(coordinator)
+    calendar_data.update_events()
+    async_add_entities(
+        [
+            PagerDutyCalendar(
+                coordinator,
+                calendar_data,
+                (CALENDAR_USER, user_id),
+                "PagerDuty On-Call Schedule",
+                f"pd_oncall_calendar_{user_id}",
+            )
+        ]
+    )
+    if not config_entry.options.get(CONF_TEAM_CALENDARS):
+        return
+
+    known_keys = {(CALENDAR_USER, user_id)}
+
+    @callback
+    def async_add_team_calendars():
+        """Add calendars for schedules and users that have none yet."""
+        calendar_data.update_events()
+        calendars = []
+        for kind, names, name_format in (
+            (CALENDAR_SCHEDULE, calendar_data.schedule_names, "PagerDuty {}"),
+            (CALENDAR_USER, calendar_data.user_names, "PagerDuty On-Call {}"),
+        ):
+            for item_id, name in names.items():
+                key = (kind, item_id)
+                if key in known_keys:
+                    continue
+                known_keys.add(key)
+                calendars.append(
+                    PagerDutyCalendar(
+                        coordinator,
+                        calendar_data,
+                        key,
+                        name_format.format(name or item_id),
+                        f"pd_oncall_calendar_{user_id}_{kind}_{item_id}",
+                    )
+                )
+        if calendars:
+            async_add_entities(calendars)
+
+    async_add_team_calendars()
+    config_entry.async_on_unload(
+        coordinator.async_add_listener(async_add_team_calendars)
+    )
+
+
+class PagerDutyCalendar(CoordinatorEntity, CalendarEntity):
     """Representation of a PagerDuty calendar."""
 
-    def __init__(self, coordinator, user_id):
+    def __init__(self, coordinator, calendar_data, key, name, unique_id):
         """Initialize the PagerDuty calendar."""
-        self.coordinator = coordinator
-        self.user_id = user_id
-        self._attr_name = "PagerDuty On-Call Schedule"
-        self._attr_unique_id = f"pd_oncall_calendar_{self.user_id}"
-        self.calendar_data = PagerDutyCalendarData(
-            self.coordinator, self.user_id
-        )
-        self._events = []
+        super().__init__(coordinator)
+        self.calendar_data = calendar_data
+        self.key = key
+        self._attr_name = name
+        self._attr_unique_id = unique_id
+        self.calendar_data.update_events()
+        self._version = self.calendar_data.version
+        self._last_available = None
 
     @property
     def device_info(self):
@@ -106,23 +233,23 @@ class PagerDutyCalendar(CalendarEntity):
 
     async def async_get_events(self, hass, start_date, end_date):
         """Return events between start_date and end_date."""
-        all_events = await self.calendar_data.fetch_all_events()
-        return [
-            event
-            for event in all_events
-            if event.start <= end_date and event.end >= start_date
-        ]
+        return await self.calendar_data.async_get_events(
+            self.key, start_date, end_date
+        )
 
-    async def async_update(self):
-        """Fetch new events and update."""
-        await self.calendar_data.fetch_all_events()
-        self._events = self.calendar_data.events
+    @callback
+    def _handle_coordinator_update(self):
+        """Write state only when the events or availability changed."""
+        self.calendar_data.update_events()
+        if (
+            self._version != self.calendar_data.version
+            or self.available != self._last_available
+        ):
+            self._version = self.calendar_data.version
+            self._last_available = self.available
+            self.async_write_ha_state()
 
     @property
     def event(self):
         """Return the next upcoming event."""
-        now = dt_util.now()
-        upcoming_events = [e for e in self._events if e.end > now]
-        if upcoming_events:
-            return sorted(upcoming_events, key=lambda e: e.start)[0]
-        return None
+        return self.calendar_data.index(self.key).next_event(dt_util.now())
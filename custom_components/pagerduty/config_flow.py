@@ -1,9 +1,23 @@
 import voluptuous as vol
 import logging
 from homeassistant import config_entries
-from homeassistant.const import CONF_API_KEY
-from .const import DOMAIN, REQUIRED_ROLES
-from pagerduty import RestApiV2Client, Error
+from homeassistant.components import webhook
+from homeassistant.const import CONF_API_KEY, CONF_WEBHOOK_ID
+from homeassistant.core import callback
+from .const import (
+    DOMAIN,
+    REQUIRED_ROLES,
+    CONF_SCHEDULE_CONCURRENCY,
+    DEFAULT_SCHEDULE_CONCURRENCY,
+    CONF_WEBHOOK_ENABLED,
+    CONF_WEBHOOK_SECRET,
+    CONF_TEAM_CALENDARS,
+    CONF_INCIDENT_STATISTICS,
+    CONF_NOTIFY_COALESCE_WINDOW,
+    DEFAULT_NOTIFY_COALESCE_WINDOW,
+)
+from .api import PagerDutyApiClient, PagerDutyApiError
+from .webhook import webhook_url
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -13,6 +27,12 @@ class PagerDutyConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """Return the options flow."""
+        return PagerDutyOptionsFlow()
+
     async def async_step_user(self, user_input=None):
         """Handle the initial step."""
         errors = {}
@@ -22,10 +42,8 @@ class PagerDutyConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 user_input.get("api_server", "US")
             )
 
-            valid, user_data = await self.hass.async_add_executor_job(
-                self._test_api_key_and_fetch_user_data,
-                user_input[CONF_API_KEY],
-                api_base_url,
+            valid, user_data = await self._test_api_key_and_fetch_user_data(
+                user_input[CONF_API_KEY], api_base_url
             )
             if valid:
                 user_input.update(user_data)
@@ -47,6 +65,10 @@ class PagerDutyConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                     vol.Optional("api_server", default="US"): vol.In(
                         ["US", "EU"]
                     ),
+                    vol.Optional(
+                        CONF_SCHEDULE_CONCURRENCY,
+                        default=DEFAULT_SCHEDULE_CONCURRENCY,
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=20)),
                 }
             ),
             errors=errors,
@@ -61,22 +83,23 @@ class PagerDutyConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             else "https://api.eu.pagerduty.com"
         )
 
-    def _test_api_key_and_fetch_user_data(self, api_key, api_base_url):
+    async def _test_api_key_and_fetch_user_data(self, api_key, api_base_url):
         """Test the API key and fetch abilities to validate roles."""
-        session = RestApiV2Client(api_key)
-        session.url = api_base_url
+        session = PagerDutyApiClient(self.hass, api_key, api_base_url)
         try:
-            abilities = session.rget("/abilities")
+            abilities = await session.rget("/abilities")
             _LOGGER.debug(f"Available roles: {abilities}")
 
             # for future role check discovery
             # if not self._validate_user_roles(abilities):
             #     raise PDClientError("User does not have required roles")
-            user = session.rget("/users/me", params={"include[]": "teams"})
+            user = await session.rget(
+                "/users/me", params={"include[]": "teams"}
+            )
             _LOGGER.debug(f"User {user}")
             return True, {"user": user}
 
-        except Error:
+        except PagerDutyApiError:
             return False, {}
 
     def _validate_user_roles(self, abilities):
@@ -88,3 +111,68 @@ class PagerDutyConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             processed_abilities.add(base_ability)
 
         return any(role in processed_abilities for role in REQUIRED_ROLES)
+
+
+class PagerDutyOptionsFlow(config_entries.OptionsFlow):
+    """Handle PagerDuty options."""
+
+    _webhook_id = None
+
+    async def async_step_init(self, user_input=None):
+        """Manage push mode, team calendars, statistics and notifications."""
+        errors = {}
+        options = self.config_entry.options
+        if self._webhook_id is None:
+            self._webhook_id = (
+                options.get(CONF_WEBHOOK_ID) or webhook.async_generate_id()
+            )
+
+        if user_input is not None:
+            if user_input[CONF_WEBHOOK_ENABLED] and not user_input.get(
+                CONF_WEBHOOK_SECRET
+            ):
+                errors["base"] = "webhook_secret_required"
+            else:
+                return self.async_create_entry(
+                    title="",
+                    data={
+                        **options,
+                        **user_input,
+                        CONF_WEBHOOK_ID: self._webhook_id,
+                    },
+                )
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(
+                        CONF_WEBHOOK_ENABLED,
+                        default=options.get(CONF_WEBHOOK_ENABLED, False),
+                    ): bool,
+                    vol.Optional(
+                        CONF_WEBHOOK_SECRET,
+                        default=options.get(CONF_WEBHOOK_SECRET, ""),
+                    ): str,
+                    vol.Optional(
+                        CONF_TEAM_CALENDARS,
+                        default=options.get(CONF_TEAM_CALENDARS, False),
+                    ): bool,
+                    vol.Optional(
+                        CONF_INCIDENT_STATISTICS,
+                        default=options.get(CONF_INCIDENT_STATISTICS, False),
+                    ): bool,
+                    vol.Optional(
+                        CONF_NOTIFY_COALESCE_WINDOW,
+                        default=options.get(
+                            CONF_NOTIFY_COALESCE_WINDOW,
+                            DEFAULT_NOTIFY_COALESCE_WINDOW,
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                }
+            ),
+            errors=errors,
+            description_placeholders={
+                "webhook_url": webhook_url(self.hass, self._webhook_id)
+            },
+        )
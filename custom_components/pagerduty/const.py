@@ -7,3 +7,54 @@ REQUIRED_ROLES = [
     "schedules.read",
     "services.read",
 ]
+CONF_SCHEDULE_CONCURRENCY = "schedule_concurrency"
+DEFAULT_SCHEDULE_CONCURRENCY = 5
+DATA_CLASS_USER = "user"
+DATA_CLASS_SERVICES = "services"
+DATA_CLASS_INCIDENTS = "incidents"
+DATA_CLASS_SCHEDULES = "schedules"
+DATA_CLASSES = [
+    DATA_CLASS_USER,
+    DATA_CLASS_SERVICES,
+    DATA_CLASS_INCIDENTS,
+    DATA_CLASS_SCHEDULES,
+]
+SERVICE_REFRESH = "refresh"
+METRIC_ENTITIES_WRITTEN = "entities_written"
+METRIC_NOTIFY_QUEUE_DEPTH = "notify_queue_depth"
+METRIC_NOTIFY_DISPATCH_LATENCY = "notify_dispatch_latency"
+METRIC_NOTIFY_SPOOL_AGE = "notify_spool_age"
+METRIC_NOTIFY_COALESCED = "notify_coalesced"
+CONF_WEBHOOK_ENABLED = "webhook_enabled"
+CONF_WEBHOOK_SECRET = "webhook_secret"
+CONF_TEAM_CALENDARS = "team_calendars"
+CONF_INCIDENT_STATISTICS = "incident_statistics"
+CONF_NOTIFY_COALESCE_WINDOW = "notify_coalesce_window"
+DEFAULT_NOTIFY_COALESCE_WINDOW = 300
+SERVICE_ACKNOWLEDGE_INCIDENTS = "acknowledge_incidents"
+SERVICE_RESOLVE_INCIDENTS = "resolve_incidents"
+SERVICE_SNOOZE_INCIDENTS = "snooze_incidents"
+SERVICE_REASSIGN_INCIDENTS = "reassign_incidents"
+SERVICE_GET_INCIDENTS = "get_incidents"
+METRIC_API_REQUESTS = "api_requests"
+METRIC_API_PAGES = "api_pages"
+METRIC_API_BYTES = "api_bytes"
+METRIC_API_RETRIES = "api_retries"
+METRIC_API_THROTTLED = "api_throttled"
+METRIC_API_SHARED = "api_shared"
+PHASE_REFRESH = "refresh"
+PHASE_FETCH_USER = "fetch_user"
+PHASE_FETCH_SERVICES = "fetch_services"
+PHASE_FETCH_INCIDENTS = "fetch_incidents"
+PHASE_FETCH_SCHEDULES = "fetch_on_call_schedules"
+PHASE_BUILD_INDEX = "build_index"
+PHASE_RECOMPUTE = "recompute"
+PHASES = [
+    PHASE_REFRESH,
+    PHASE_FETCH_USER,
+    PHASE_FETCH_SERVICES,
+    PHASE_FETCH_INCIDENTS,
+    PHASE_FETCH_SCHEDULES,
+    PHASE_BUILD_INDEX,
+    PHASE_RECOMPUTE,
+]
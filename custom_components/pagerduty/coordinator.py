@@ -1,23 +1,105 @@
 import logging
+from homeassistant.core import callback
 from homeassistant.util import dt as dt_util
 from datetime import timedelta
 from homeassistant.helpers.update_coordinator import (
     DataUpdateCoordinator,
     UpdateFailed,
 )
-from .const import DOMAIN
+from .api import PagerDutyApiError, account_from_url, gather_bounded
+from .index import IncidentIndex
+from .metrics import PagerDutyMetrics
+from .models import Incident, Service
+from .schedules import ScheduleWindowCache
+from .stats import IncidentStatistics
+from .snapshot import PagerDutySnapshotStore
+from .const import (
+    DOMAIN,
+    DEFAULT_SCHEDULE_CONCURRENCY,
+    DATA_CLASS_USER,
+    DATA_CLASS_SERVICES,
+    DATA_CLASS_INCIDENTS,
+    DATA_CLASS_SCHEDULES,
+    DATA_CLASSES,
+    METRIC_ENTITIES_WRITTEN,
+    PHASE_REFRESH,
+    PHASE_FETCH_USER,
+    PHASE_FETCH_SERVICES,
+    PHASE_FETCH_INCIDENTS,
+    PHASE_FETCH_SCHEDULES,
+    PHASE_BUILD_INDEX,
+    PHASE_RECOMPUTE,
+)
 
 _LOGGER = logging.getLogger(__name__)
 SCAN_INTERVAL = timedelta(seconds=30)
+ACTIVE_SCAN_INTERVAL = timedelta(seconds=15)
+IDLE_SCAN_INTERVAL = timedelta(seconds=90)
+MAX_ERROR_SCAN_INTERVAL = timedelta(minutes=15)
+PUSH_SCAN_INTERVAL = timedelta(minutes=5)
+INCIDENT_RECONCILE_INTERVAL = timedelta(minutes=10)
+INCIDENT_SYNC_OVERLAP = timedelta(seconds=30)
+INCIDENT_FETCH_CONCURRENCY = 5
+INCIDENT_CHANGE_RECONCILE_THRESHOLD = 50
+LOG_ENTRY_STATUSES = {
+    "trigger_log_entry": "triggered",
+    "acknowledge_log_entry": "acknowledged",
+    "resolve_log_entry": "resolved",
+}
+INCIDENT_QUERY_CHUNK_SIZE = 100
+INCIDENT_UPDATE_BATCH_SIZE = 250
+ACTIVE_INCIDENT_STATUSES = ["acknowledged", "triggered"]
+SCHEDULE_WINDOW = timedelta(days=14)
+REFRESH_INTERVALS = {
+    DATA_CLASS_USER: timedelta(hours=1),
+    DATA_CLASS_SERVICES: timedelta(hours=1),
+    DATA_CLASS_SCHEDULES: timedelta(minutes=15),
+}
+REFRESH_PHASES = {
+    DATA_CLASS_USER: PHASE_FETCH_USER,
+    DATA_CLASS_SERVICES: PHASE_FETCH_SERVICES,
+    DATA_CLASS_SCHEDULES: PHASE_FETCH_SCHEDULES,
+}
 
 
 class PagerDutyDataUpdateCoordinator(DataUpdateCoordinator):
     """Class to manage fetching PagerDuty data."""
 
-    def __init__(self, hass, session, ignored_team_ids):
+    def __init__(
+        self,
+        hass,
+        session,
+        ignored_team_ids,
+        schedule_concurrency=DEFAULT_SCHEDULE_CONCURRENCY,
+        metrics=None,
+        entry_id=None,
+        incident_statistics=False,
+    ):
         """Initialize."""
         self.session = session
+        self.metrics = metrics or PagerDutyMetrics()
+        self.statistics = IncidentStatistics() if incident_statistics else None
+        self.snapshot = (
+            PagerDutySnapshotStore(hass, entry_id) if entry_id else None
+        )
         self.ignored_team_ids = ignored_team_ids
+        self.schedule_concurrency = max(1, int(schedule_concurrency))
+        self.schedule_windows = ScheduleWindowCache(
+            session, self.schedule_concurrency
+        )
+        self.schedule_range = None
+        self._incidents = {}
+        self._incident_service_ids = set()
+        self._incident_team_ids = []
+        self._services = None
+        self._service_teams = {}
+        self._incidents_synced_at = None
+        self._incidents_reconciled_at = None
+        self._cache = {}
+        self._stale_data_classes = set()
+        self._consecutive_errors = 0
+        self.push_enabled = False
+        self.user_email = None
         _LOGGER.debug(f"Ignored teams: {ignored_team_ids}")
 
         super().__init__(
@@ -33,10 +115,276 @@ class PagerDutyDataUpdateCoordinator(DataUpdateCoordinator):
                 "Initial data update failed, will retry in background"
             )
 
+    async def async_restore_snapshot(self):
+        """Load the last saved data so entities can start without the API.
+
+        Returns whether a snapshot was restored.
+        """
+        if self.snapshot is None:
+            return False
+        snapshot = await self.snapshot.async_load()
+        if not snapshot:
+            return False
+        snapshot["index"] = IncidentIndex(
+            snapshot["incidents"], snapshot["services"]
+        )
+        self.data = snapshot
+        _LOGGER.debug(
+            f"Restored snapshot with {len(snapshot['services'])} services "
+            f"and {len(snapshot['incidents'])} incidents"
+        )
+        return True
+
+    @callback
+    def async_update_listeners(self):
+        """Update listeners and record how many of them wrote new state."""
+        self.metrics.set(METRIC_ENTITIES_WRITTEN, 0)
+        with self.metrics.timer(PHASE_RECOMPUTE):
+            super().async_update_listeners()
+        self.metrics.async_notify()
+
+    def _adapt_update_interval(self, index):
+        """Poll faster while incidents are triggered and back off on errors.
+
+        After consecutive failures the interval doubles from SCAN_INTERVAL up
+        to MAX_ERROR_SCAN_INTERVAL. With webhooks pushing incident updates it
+        is PUSH_SCAN_INTERVAL, only reconciling. Otherwise it is
+        ACTIVE_SCAN_INTERVAL when any incident is triggered and
+        IDLE_SCAN_INTERVAL when none is.
+        """
+        if self._consecutive_errors:
+            interval = min(
+                MAX_ERROR_SCAN_INTERVAL,
+                SCAN_INTERVAL * 2 ** min(self._consecutive_errors, 5),
+            )
+        elif self.push_enabled:
+            interval = PUSH_SCAN_INTERVAL
+        elif index.total.status["triggered"]:
+            interval = ACTIVE_SCAN_INTERVAL
+        else:
+            interval = IDLE_SCAN_INTERVAL
+        if interval != self.update_interval:
+            _LOGGER.debug(f"Polling PagerDuty every {interval}")
+            self.update_interval = interval
+
+    @callback
+    def async_apply_incident(self, incident):
+        """Merge a pushed incident into the current data and notify entities."""
+        self.async_apply_incidents([incident])
+
+    @callback
+    def async_apply_incidents(self, incidents):
+        """Merge updated incidents into the current data and notify entities.
+
+        The refresh schedule is left alone, so the reconciling poll still
+        runs while incidents keep being pushed.
+        """
+        if self.data is None:
+            return
+        changed = sum(map(self._merge_incident, incidents))
+        if not changed:
+            return
+
+        incidents = list(self._incidents.values())
+        _LOGGER.debug(f"Applied updates of {changed} incidents")
+        self.data = {
+            **self.data,
+            "incidents": incidents,
+            "index": IncidentIndex(incidents, self.data["services"]),
+        }
+        self.async_update_listeners()
+
+    async def async_force_refresh(self, data_classes=None):
+        """Drop cached data for the given data classes and refresh now."""
+        data_classes = set(data_classes or DATA_CLASSES)
+        _LOGGER.debug(f"Forcing refresh of {data_classes}")
+        self._stale_data_classes.update(data_classes & set(REFRESH_INTERVALS))
+        if DATA_CLASS_INCIDENTS in data_classes:
+            self._incidents_reconciled_at = None
+        if DATA_CLASS_SCHEDULES in data_classes:
+            self.schedule_windows.async_invalidate()
+        self.session.clear_shared_responses()
+        await self.async_refresh()
+
+    def select_incidents(self, **filters):
+        """Return the IDs of cached incidents matching all given filters."""
+        return [incident.id for incident in self.filter_incidents(**filters)]
+
+    def filter_incidents(
+        self,
+        incident_ids=None,
+        service_ids=None,
+        team_ids=None,
+        urgency=None,
+        assigned_to_me=False,
+        status=None,
+    ):
+        """Return the cached incidents matching all given filters."""
+        if self.data is None:
+            return []
+        incident_ids = set(incident_ids or ())
+        service_ids = set(service_ids or ())
+        team_ids = set(team_ids or ())
+        service_teams = {
+            service.id: service.team_id for service in self.data["services"]
+        }
+        if assigned_to_me:
+            incidents = self.data["index"].assigned_to(self.data["user_id"])
+        else:
+            incidents = self.data["incidents"]
+        return [
+            incident
+            for incident in incidents
+            if (not incident_ids or incident.id in incident_ids)
+            and (not service_ids or incident.service_id in service_ids)
+            and (
+                not team_ids
+                or service_teams.get(incident.service_id) in team_ids
+            )
+            and (not urgency or incident.urgency == urgency)
+            and (not status or incident.status == status)
+        ]
+
+    async def async_update_incidents(self, incident_ids, changes):
+        """Apply the same changes to incidents with bulk updates.
+
+        Incidents are sent in batches of INCIDENT_UPDATE_BATCH_SIZE and the
+        returned incidents are merged into the data right away. Returns the
+        IDs that were updated and the IDs whose batch failed.
+        """
+        batches = _chunks(incident_ids, INCIDENT_UPDATE_BATCH_SIZE)
+        results = await gather_bounded(
+            INCIDENT_FETCH_CONCURRENCY,
+            [
+                self.session.rput(
+                    "/incidents",
+                    json={
+                        "incidents": [
+                            {
+                                "id": incident_id,
+                                "type": "incident_reference",
+                                **changes,
+                            }
+                            for incident_id in batch
+                        ]
+                    },
+                    headers=self._from_header(),
+                )
+                for batch in batches
+            ],
+        )
+        return self._apply_results("update", batches, results)
+
+    async def async_snooze_incidents(self, incident_ids, duration):
+        """Snooze incidents for a duration in seconds.
+
+        PagerDuty has no bulk snooze, so incidents are snoozed one by one.
+        Returns the IDs that were snoozed and the IDs that failed.
+        """
+        results = await gather_bounded(
+            INCIDENT_FETCH_CONCURRENCY,
+            [
+                self.session.rpost(
+                    f"/incidents/{incident_id}/snooze",
+                    json={"duration": duration},
+                    headers=self._from_header(),
+                )
+                for incident_id in incident_ids
+            ],
+        )
+        return self._apply_results(
+            "snooze",
+            [[incident_id] for incident_id in incident_ids],
+            [
+                [result] if isinstance(result, dict) else result
+                for result in results
+            ],
+        )
+
+    def _from_header(self):
+        """Return the From header PagerDuty requires for incident changes."""
+        return {"From": self.user_email} if self.user_email else None
+
+    def _apply_results(self, action, batches, results):
+        """Merge the incidents returned for each batch into the data."""
+        updated = []
+        failed = []
+        for batch, result in zip(batches, results):
+            if isinstance(result, Exception):
+                _LOGGER.warning(
+                    f"Failed to {action} incidents {batch}: {result}"
+                )
+                failed.extend(batch)
+                continue
+            updated.extend(Incident.from_api(item) for item in result or [])
+        self.async_apply_incidents(updated)
+        return [incident.id for incident in updated], failed
+
+    def schedules_cover(self, start, end):
+        """Return whether the polled schedules cover a time range."""
+        if self.schedule_range is None:
+            return False
+        since, until = self.schedule_range
+        return dt_util.start_of_local_day(
+            since
+        ) <= start and end <= dt_util.start_of_local_day(until)
+
+    async def async_get_schedules_between(self, start, end):
+        """Return the current schedules rendered for the days of a range.
+
+        Renders are loaded on demand and cached per schedule and range.
+        """
+        schedule_ids = [
+            schedule.id
+            for schedule in (self.data or {}).get("on_call_schedules", [])
+        ]
+        return await self.schedule_windows.async_get(
+            schedule_ids,
+            dt_util.as_local(start).date(),
+            dt_util.as_local(end).date() + timedelta(days=1),
+            str(dt_util.DEFAULT_TIME_ZONE),
+        )
+
+    async def _async_cached(
+        self, data_class, fetch, key=None, expires_fn=None
+    ):
+        """Return cached data for a data class, fetching it when it expired.
+
+        The cached value is also dropped when its key changes, e.g. when the
+        team list that services are filtered by is different.
+        """
+        now = dt_util.utcnow()
+        cached = self._cache.get(data_class)
+        if (
+            cached is not None
+            and data_class not in self._stale_data_classes
+            and cached[0] == key
+            and now < cached[1]
+        ):
+            return cached[2]
+
+        with self.metrics.timer(REFRESH_PHASES[data_class]):
+            value = await fetch()
+        expires_at = now + REFRESH_INTERVALS[data_class]
+        if expires_fn is not None:
+            expires_at = min(expires_at, expires_fn(value, now) or expires_at)
+        self._cache[data_class] = (key, expires_at, value)
+        self._stale_data_classes.discard(data_class)
+        _LOGGER.debug(f"Refreshed {data_class}, cached until {expires_at}")
+        return value
+
     async def _async_update_data(self):
+        """Fetch data from the PagerDuty API, timing the whole refresh."""
+        with self.metrics.timer(PHASE_REFRESH):
+            try:
+                return await self._async_fetch_data()
+            finally:
+                self.session.mark_synced()
+
+    async def _async_fetch_data(self):
         """Fetch data from the PagerDuty API."""
         try:
-            user = await self.hass.async_add_executor_job(self.fetch_user)
+            user = await self._async_cached(DATA_CLASS_USER, self.fetch_user)
             _LOGGER.debug(f"Fetched user: {user}")
 
             user_id = user.get("id")
@@ -45,46 +393,72 @@ class PagerDutyDataUpdateCoordinator(DataUpdateCoordinator):
             self.teams = {
                 team["id"]: team["name"] for team in user.get("teams", [])
             }
+            self.user_email = user.get("email")
+            self.session.set_account(account_from_url(user.get("html_url")))
 
             team_ids = list(self.teams.keys())
 
             cleaned_ignored_team_ids = list(
                 set(team_ids) - set(self.ignored_team_ids)
             )
-            services = await self.hass.async_add_executor_job(
-                self.fetch_services, cleaned_ignored_team_ids
+            services = await self._async_cached(
+                DATA_CLASS_SERVICES,
+                lambda: self.fetch_services(cleaned_ignored_team_ids),
+                key=frozenset(cleaned_ignored_team_ids),
             )
             _LOGGER.debug(f"Filtered services: {services[:2]}")
+            if services is not self._services:
+                self._services = services
+                self._service_teams = {
+                    service.id: service.team_id for service in services
+                }
 
-            service_ids = [service["id"] for service in services]
+            service_ids = [service.id for service in services]
             _LOGGER.debug(f"Service IDs: {service_ids}")
 
-            incidents = await self.hass.async_add_executor_job(
-                self.fetch_incidents, service_ids
-            )
+            with self.metrics.timer(PHASE_FETCH_INCIDENTS):
+                incidents = await self.sync_incidents(
+                    service_ids, cleaned_ignored_team_ids
+                )
             _LOGGER.debug(f"Fetched incidents. Sample: {incidents[:2]}")
 
-            on_call_schedules = await self.hass.async_add_executor_job(
-                self.fetch_on_call_schedules,
-                user_id,
-                str(dt_util.DEFAULT_TIME_ZONE),
+            time_zone = str(dt_util.DEFAULT_TIME_ZONE)
+            on_call_schedules = await self._async_cached(
+                DATA_CLASS_SCHEDULES,
+                lambda: self.fetch_on_call_schedules(user_id, time_zone),
+                key=(user_id, time_zone),
+                expires_fn=next_shift_boundary,
             )
 
-            return {
+            with self.metrics.timer(PHASE_BUILD_INDEX):
+                index = IncidentIndex(incidents, services)
+            data = {
                 "user_id": user_id,
                 "services": services,
                 "incidents": incidents,
                 "on_call_schedules": on_call_schedules,
+                "index": index,
             }
         except Exception as e:
             _LOGGER.error(f"Error communicating with PagerDuty API: {e}")
+            self._consecutive_errors += 1
+            self._adapt_update_interval(None)
             raise UpdateFailed(f"Error communicating with API: {e}")
 
-    def fetch_user(self):
+        self._consecutive_errors = 0
+        self._adapt_update_interval(data["index"])
+
+        if self.snapshot is not None:
+            self.snapshot.async_save(data)
+        return data
+
+    async def fetch_user(self):
         """Fetch user data."""
-        return self.session.rget("/users/me", params={"include[]": "teams"})
+        return await self.session.rget(
+            "/users/me", params={"include[]": "teams"}
+        )
 
-    def fetch_on_call_schedules(self, user_id, time_zone):
+    async def fetch_on_call_schedules(self, user_id, time_zone):
         """Fetch on-call schedules based on user_id from PagerDuty."""
         _LOGGER.debug(f"Fetching on-call schedules for user_id: {user_id}")
 
@@ -92,14 +466,14 @@ class PagerDutyDataUpdateCoordinator(DataUpdateCoordinator):
             return []
 
         now = dt_util.now()
-        until_date = now + timedelta(days=14)
+        until_date = now + SCHEDULE_WINDOW
 
         on_call_params = {
             "user_ids[]": user_id,
             "time_zone": str(now.tzinfo),
             "until": until_date.strftime("%Y-%m-%d"),
         }
-        response = self.session.rget("/oncalls", params=on_call_params)
+        response = await self.session.rget("/oncalls", params=on_call_params)
 
         on_calls_data = response if response else []
 
@@ -116,50 +490,257 @@ class PagerDutyDataUpdateCoordinator(DataUpdateCoordinator):
 
         _LOGGER.debug(f"Unique schedule IDs: {unique_schedule_ids}")
 
-        schedules = []
-        schedule_params = {
-            "time_zone": time_zone,
-            "since": now.strftime("%Y-%m-%d"),
-            "until": until_date.strftime("%Y-%m-%d"),
-        }
-        for schedule_id in unique_schedule_ids:
-            schedule_url = f"/schedules/{schedule_id}"
-            schedule_data = self.session.rget(
-                schedule_url, params=schedule_params
-            )
-            if schedule_data:
-                schedules.append(schedule_data)
-                _LOGGER.debug(
-                    f"Fetched schedule for schedule_id {schedule_id}: {schedule_data}"
-                )
-
+        since = now.date()
+        until = until_date.date()
+        schedules = await self.schedule_windows.async_fetch(
+            list(unique_schedule_ids), since, until, time_zone
+        )
+        self.schedule_windows.async_observe(schedules, since)
+        self.schedule_range = (since, until)
         return schedules
 
-    def fetch_services(self, team_ids):
+    async def fetch_services(self, team_ids):
         """Fetch services for given team IDs."""
         if team_ids:
-            all_services = self.session.list_all(
+            all_services = await self.session.list_all(
                 "services",
                 params={"team_ids[]": team_ids, "include[]": "teams"},
+                transform=Service.from_api,
             )
-            for service in all_services:
-                first_team = service["teams"][0]
-                service["team_name"] = first_team.get("name", "Unknown")
-                service["team_id"] = first_team.get("id", "Unknown")
         else:
-            all_services = self.session.list_all("services")
+            all_services = await self.session.list_all(
+                "services", transform=Service.from_api
+            )
 
         return all_services
 
-    def fetch_incidents(self, service_ids):
-        """Fetch incidents for given service IDs."""
-        all_incidents = []
-        all_incidents = self.session.list_all(
-            "incidents",
-            params={
-                "service_ids[]": service_ids,
-                "statuses[]": ["acknowledged", "triggered"],
-                "include[]": "users",
-            },
-        )
-        return all_incidents
+    async def sync_incidents(self, service_ids, team_ids=None):
+        """Bring the open incident set up to date for given service IDs.
+
+        A full listing runs on the first sync, whenever the watched services
+        change and every INCIDENT_RECONCILE_INTERVAL. In between, only the
+        incidents referenced by new log entries are re-fetched and merged.
+        """
+        now = dt_util.utcnow()
+        watched_service_ids = set(service_ids)
+
+        if (
+            self._incidents_reconciled_at is None
+            or self._incidents_synced_at is None
+            or watched_service_ids != self._incident_service_ids
+            or now - self._incidents_reconciled_at
+            >= INCIDENT_RECONCILE_INTERVAL
+        ):
+            incidents = await self.fetch_incidents(service_ids, team_ids)
+            self._incident_service_ids = watched_service_ids
+            self._replace_incidents(incidents)
+            self._incident_team_ids = list(team_ids or [])
+            self._incidents_reconciled_at = now
+            _LOGGER.debug(f"Reconciled {len(self._incidents)} incidents")
+        else:
+            # Whole minutes let entries polling the same account in the same
+            # cycle ask for the same log entries and share the response.
+            since = self._incidents_synced_at - INCIDENT_SYNC_OVERLAP
+            await self.fetch_incident_changes(
+                since.replace(second=0, microsecond=0)
+            )
+
+        self._incidents_synced_at = now
+        return list(self._incidents.values())
+
+    async def fetch_incident_changes(self, since):
+        """Merge incidents changed since the given time into the incident set."""
+        log_entries = await self.session.list_all(
+            "log_entries",
+            params={"since": since.isoformat(), "is_overview": "true"},
+        )
+
+        changed_ids = set()
+        for log_entry in log_entries:
+            incident_id = (log_entry.get("incident") or {}).get("id")
+            service_id = (log_entry.get("service") or {}).get("id")
+            if incident_id and service_id in self._incident_service_ids:
+                changed_ids.add(incident_id)
+
+        _LOGGER.debug(f"Incidents changed since {since}: {changed_ids}")
+        if not changed_ids:
+            return
+
+        if len(changed_ids) > INCIDENT_CHANGE_RECONCILE_THRESHOLD:
+            _LOGGER.debug("Too many changed incidents, running full sync")
+            self._observe_log_entries(log_entries)
+            incidents = await self.fetch_incidents(
+                list(self._incident_service_ids), self._incident_team_ids
+            )
+            self._replace_incidents(incidents)
+            self._incidents_reconciled_at = dt_util.utcnow()
+            return
+
+        incident_ids = list(changed_ids)
+        results = await gather_bounded(
+            INCIDENT_FETCH_CONCURRENCY,
+            [
+                self.session.rget(f"/incidents/{incident_id}")
+                for incident_id in incident_ids
+            ],
+        )
+
+        for incident_id, incident in zip(incident_ids, results):
+            if isinstance(incident, Exception):
+                _LOGGER.warning(
+                    f"Failed to fetch incident {incident_id}, "
+                    f"scheduling full sync: {incident}"
+                )
+                self._incidents_reconciled_at = None
+                continue
+            self._merge_incident(Incident.from_api(incident))
+
+    def _observe_log_entries(self, log_entries):
+        """Update the incident statistics from status-changing log entries.
+
+        Used when too many incidents changed to fetch each one, so the
+        incidents created, acknowledged and resolved since the last sync
+        are still sampled before the full listing replaces the incidents.
+        """
+        if self.statistics is None:
+            return
+        created_at = {}
+        for log_entry in sorted(
+            log_entries, key=lambda log_entry: log_entry.get("created_at", "")
+        ):
+            status = LOG_ENTRY_STATUSES.get(log_entry.get("type"))
+            incident_id = (log_entry.get("incident") or {}).get("id")
+            if status is None or not incident_id:
+                continue
+            previous = self._incidents.get(incident_id)
+            incident = Incident.from_log_entry(
+                log_entry,
+                status,
+                created_at.get(incident_id)
+                or (previous.created_at if previous else None),
+            )
+            created_at[incident_id] = incident.created_at
+            self._observe(previous, incident)
+
+    def _merge_incident(self, incident):
+        """Store a changed incident, or drop it once it is not watched.
+
+        Returns whether the incident set changed.
+        """
+        previous = self._incidents.get(incident.id)
+        self._observe(previous, incident)
+        if self._is_watched(incident):
+            self._incidents[incident.id] = incident
+            return True
+        if previous is None:
+            return False
+        del self._incidents[incident.id]
+        if self.statistics is not None:
+            self.statistics.forget(incident.id)
+        return True
+
+    def _replace_incidents(self, incidents):
+        """Replace the incident set with a full listing."""
+        incidents = {incident.id: incident for incident in incidents}
+        if self.statistics is not None:
+            for incident in incidents.values():
+                previous = self._incidents.get(incident.id)
+                if incident != previous:
+                    self._observe(previous, incident)
+            for incident_id in self._incidents.keys() - incidents.keys():
+                self.statistics.forget(incident_id)
+        self._incidents = incidents
+
+    def _observe(self, previous, incident):
+        """Update the incident statistics with an incident's change."""
+        if (
+            self.statistics is not None
+            and incident.service_id in self._incident_service_ids
+        ):
+            self.statistics.observe(
+                previous,
+                incident,
+                self._service_teams.get(incident.service_id),
+            )
+
+    def _is_watched(self, incident):
+        """Return whether an incident is open on a watched service."""
+        return (
+            incident.status in ACTIVE_INCIDENT_STATUSES
+            and incident.service_id in self._incident_service_ids
+        )
+
+    async def fetch_incidents(self, service_ids, team_ids=None):
+        """Fetch incidents for given service IDs.
+
+        Service IDs are queried in chunks of INCIDENT_QUERY_CHUNK_SIZE to
+        keep URLs short, and the chunks are fetched concurrently. When the
+        services were selected by team and the teams need fewer queries,
+        incidents are filtered by team instead and then narrowed down to the
+        given services.
+        """
+        service_chunks = _chunks(service_ids, INCIDENT_QUERY_CHUNK_SIZE)
+        team_chunks = _chunks(team_ids or [], INCIDENT_QUERY_CHUNK_SIZE)
+
+        if team_chunks and len(team_chunks) < len(service_chunks):
+            try:
+                return await self._fetch_incident_chunks(
+                    "team_ids[]", team_chunks, set(service_ids)
+                )
+            except PagerDutyApiError as e:
+                if e.status not in (400, 403):
+                    raise
+                _LOGGER.debug(
+                    f"Filtering incidents by team failed, using services: {e}"
+                )
+
+        return await self._fetch_incident_chunks(
+            "service_ids[]", service_chunks, set(service_ids)
+        )
+
+    async def _fetch_incident_chunks(self, filter_param, chunks, service_ids):
+        """Fetch open incidents for each chunk of filter values concurrently."""
+        results = await gather_bounded(
+            INCIDENT_FETCH_CONCURRENCY,
+            [
+                self.session.list_all(
+                    "incidents",
+                    params={
+                        filter_param: chunk,
+                        "statuses[]": ACTIVE_INCIDENT_STATUSES,
+                    },
+                    transform=Incident.from_api,
+                )
+                for chunk in chunks
+            ],
+        )
+
+        all_incidents = {}
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+            for incident in result:
+                if incident.service_id in service_ids:
+                    all_incidents[incident.id] = incident
+        _LOGGER.debug(
+            f"Fetched {len(all_incidents)} incidents in {len(chunks)} "
+            f"queries by {filter_param}"
+        )
+        return list(all_incidents.values())
+
+
+def _chunks(items, size):
+    """Split items into lists of at most size items."""
+    items = list(items)
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+def next_shift_boundary(schedules, now):
+    """Return the earliest shift start or end after now in the schedules."""
+    boundary = None
+    for schedule in schedules:
+        for entry in schedule.entries:
+            for moment in (entry.start, entry.end):
+                if moment > now and (boundary is None or moment < boundary):
+                    boundary = moment
+    return boundary
@@ -0,0 +1,44 @@
+"""Diagnostics support for PagerDuty."""
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.const import CONF_WEBHOOK_ID
+from .const import DOMAIN, CONF_API_KEY, CONF_WEBHOOK_SECRET, PHASES
+
+TO_REDACT = {
+    CONF_API_KEY,
+    CONF_WEBHOOK_SECRET,
+    CONF_WEBHOOK_ID,
+    "user",
+    "email",
+    "name",
+    "html_url",
+    "contact_methods",
+}
+
+
+async def async_get_config_entry_diagnostics(hass, entry):
+    """Return diagnostics for a config entry."""
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    coordinator = entry_data["coordinator"]
+    metrics = entry_data["metrics"]
+    data = coordinator.data or {}
+    return {
+        "entry": {
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": async_redact_data(dict(entry.options), TO_REDACT),
+        },
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "update_interval": str(coordinator.update_interval),
+            "push_enabled": coordinator.push_enabled,
+            "services": len(data.get("services", [])),
+            "incidents": len(data.get("incidents", [])),
+            "on_call_schedules": len(data.get("on_call_schedules", [])),
+        },
+        "metrics": dict(metrics.values),
+        "phases": {phase: metrics.percentiles(phase) for phase in PHASES},
+        "endpoints": {
+            endpoint: dict(counts)
+            for endpoint, counts in sorted(metrics.endpoints.items())
+        },
+    }
@@ -0,0 +1,82 @@
+"""Precomputed incident lookups for PagerDuty sensors."""
+
+from collections import Counter, defaultdict
+
+
+class IncidentCounts:
+    """Incident count with urgency and status breakdowns."""
+
+    __slots__ = ("count", "urgency", "status")
+
+    def __init__(self):
+        """Initialize empty counts."""
+        self.count = 0
+        self.urgency = Counter()
+        self.status = Counter()
+
+    def add(self, incident):
+        """Count an incident."""
+        self.count += 1
+        self.urgency[incident.urgency or "unknown"] += 1
+        self.status[incident.status or "unknown"] += 1
+
+    def attributes(self):
+        """Return the breakdowns as sensor attributes."""
+        return {
+            "urgency_low": self.urgency["low"],
+            "urgency_high": self.urgency["high"],
+            "status_triggered": self.status["triggered"],
+            "status_acknowledged": self.status["acknowledged"],
+        }
+
+
+EMPTY_COUNTS = IncidentCounts()
+
+
+class IncidentIndex:
+    """Incident counts grouped by service, team and assignee.
+
+    Built in a single pass over the incidents once per coordinator refresh,
+    so sensors can read their values without scanning the incident list.
+    """
+
+    def __init__(self, incidents, services):
+        """Build the index."""
+        service_teams = {service.id: service.team_id for service in services}
+        self.total = IncidentCounts()
+        self.by_service = defaultdict(IncidentCounts)
+        self.by_team = defaultdict(IncidentCounts)
+        self.by_assignee = defaultdict(IncidentCounts)
+        self.assigned_incidents = defaultdict(list)
+
+        for incident in incidents:
+            self.total.add(incident)
+            service_id = incident.service_id
+            self.by_service[service_id].add(incident)
+            team_id = service_teams.get(service_id)
+            if team_id:
+                self.by_team[team_id].add(incident)
+            for assignee_id in set(incident.assignee_ids):
+                self.by_assignee[assignee_id].add(incident)
+                self.assigned_incidents[assignee_id].append(incident)
+
+        self.by_service = dict(self.by_service)
+        self.by_team = dict(self.by_team)
+        self.by_assignee = dict(self.by_assignee)
+        self.assigned_incidents = dict(self.assigned_incidents)
+
+    def service(self, service_id):
+        """Return the counts for a service."""
+        return self.by_service.get(service_id, EMPTY_COUNTS)
+
+    def team(self, team_id):
+        """Return the counts for a team."""
+        return self.by_team.get(team_id, EMPTY_COUNTS)
+
+    def assignee(self, user_id):
+        """Return the counts for incidents assigned to a user."""
+        return self.by_assignee.get(user_id, EMPTY_COUNTS)
+
+    def assigned_to(self, user_id):
+        """Return the incidents assigned to a user."""
+        return self.assigned_incidents.get(user_id, [])
@@ -0,0 +1,81 @@
+"""Runtime metrics collected by the PagerDuty integration."""
+
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from homeassistant.core import callback
+
+ROLLING_WINDOW = 100
+PERCENTILES = (50, 90, 99)
+
+
+class PagerDutyMetrics:
+    """Named metric values shared by the coordinator and its entities."""
+
+    def __init__(self):
+        """Initialize the metrics."""
+        self.values = {}
+        self.samples = defaultdict(lambda: deque(maxlen=ROLLING_WINDOW))
+        self.endpoints = defaultdict(Counter)
+        self._listeners = []
+
+    def get(self, name, default=None):
+        """Return the current value of a metric."""
+        return self.values.get(name, default)
+
+    def set(self, name, value):
+        """Set a metric to a value."""
+        self.values[name] = value
+
+    def increment(self, name, amount=1):
+        """Add to a counter metric."""
+        self.values[name] = self.values.get(name, 0) + amount
+
+    def observe(self, name, value):
+        """Record a sample, keeping the last ROLLING_WINDOW of them."""
+        self.values[name] = value
+        self.samples[name].append(value)
+
+    @contextmanager
+    def timer(self, name):
+        """Observe how many milliseconds the block took."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, round((time.perf_counter() - start) * 1000, 1))
+
+    def percentiles(self, name):
+        """Return the rolling percentiles of a sampled metric."""
+        samples = sorted(self.samples.get(name, ()))
+        if not samples:
+            return {}
+        return {
+            f"p{percentile}": samples[
+                min(len(samples) - 1, len(samples) * percentile // 100)
+            ]
+            for percentile in PERCENTILES
+        } | {"samples": len(samples)}
+
+    def count_request(self, endpoint, **counts):
+        """Add to the request counters of an API endpoint."""
+        self.endpoints[endpoint].update(counts)
+        for name, amount in counts.items():
+            self.increment(f"api_{name}", amount)
+
+    @callback
+    def async_add_listener(self, update_callback):
+        """Listen for metric updates and return a function to stop."""
+        self._listeners.append(update_callback)
+
+        @callback
+        def remove_listener():
+            self._listeners.remove(update_callback)
+
+        return remove_listener
+
+    @callback
+    def async_notify(self):
+        """Tell listeners that metric values changed."""
+        for update_callback in list(self._listeners):
+            update_callback()
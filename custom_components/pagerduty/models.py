@@ -0,0 +1,223 @@
+"""Compact records of the PagerDuty data the integration keeps."""
+
+from dataclasses import asdict, astuple, dataclass
+from datetime import datetime
+from homeassistant.util import dt as dt_util
+
+
+def _parse_datetime(value):
+    """Parse an API or stored datetime string."""
+    if not value:
+        return None
+    return dt_util.parse_datetime(value)
+
+
+def _format_datetime(value):
+    """Return a datetime as a string for storage."""
+    return value.isoformat() if value else None
+
+
+@dataclass(slots=True, frozen=True)
+class Service:
+    """A PagerDuty service and the first team it belongs to."""
+
+    id: str
+    summary: str | None
+    team_id: str | None
+    team_name: str | None
+
+    @classmethod
+    def from_api(cls, data):
+        """Project a service from the REST API."""
+        teams = data.get("teams") or [{}]
+        return cls(
+            data["id"],
+            data.get("summary"),
+            teams[0].get("id"),
+            teams[0].get("name"),
+        )
+
+    def to_storage(self):
+        """Return the record as a list for storage."""
+        return list(astuple(self))
+
+    @classmethod
+    def from_storage(cls, values):
+        """Restore a record stored by to_storage."""
+        return cls(*values)
+
+
+@dataclass(slots=True, frozen=True)
+class Incident:
+    """An open PagerDuty incident."""
+
+    id: str
+    service_id: str | None
+    service_summary: str | None
+    urgency: str | None
+    status: str | None
+    title: str | None
+    description: str | None
+    assignee_ids: tuple[str, ...]
+    created_at: datetime | None = None
+    last_status_change_at: datetime | None = None
+
+    @classmethod
+    def from_api(cls, data):
+        """Project an incident from the REST API."""
+        service = data.get("service") or {}
+        return cls(
+            data["id"],
+            service.get("id"),
+            service.get("summary"),
+            data.get("urgency"),
+            data.get("status"),
+            data.get("title"),
+            data.get("description"),
+            tuple(
+                assignment["assignee"]["id"]
+                for assignment in data.get("assignments", [])
+                if (assignment.get("assignee") or {}).get("id")
+            ),
+            _parse_datetime(data.get("created_at")),
+            _parse_datetime(data.get("last_status_change_at")),
+        )
+
+    @classmethod
+    def from_log_entry(cls, data, status, created_at=None):
+        """Project the incident of a log entry changing it to a status.
+
+        A trigger log entry's time is the incident's creation time.
+        """
+        incident = data.get("incident") or {}
+        service = data.get("service") or {}
+        changed_at = _parse_datetime(data.get("created_at"))
+        if status == "triggered":
+            created_at = created_at or changed_at
+        return cls(
+            incident["id"],
+            service.get("id"),
+            service.get("summary"),
+            None,
+            status,
+            incident.get("summary"),
+            None,
+            (),
+            created_at,
+            changed_at,
+        )
+
+    def to_storage(self):
+        """Return the record as a list for storage."""
+        return [
+            *astuple(self)[:7],
+            list(self.assignee_ids),
+            _format_datetime(self.created_at),
+            _format_datetime(self.last_status_change_at),
+        ]
+
+    def to_dict(self):
+        """Return the record as a dictionary for service responses."""
+        return {
+            **asdict(self),
+            "assignee_ids": list(self.assignee_ids),
+            "created_at": _format_datetime(self.created_at),
+            "last_status_change_at": _format_datetime(
+                self.last_status_change_at
+            ),
+        }
+
+    @classmethod
+    def from_storage(cls, values):
+        """Restore a record stored by to_storage."""
+        return cls(
+            *values[:7],
+            tuple(values[7]),
+            _parse_datetime(values[8]),
+            _parse_datetime(values[9]),
+        )
+
+
+@dataclass(slots=True, frozen=True)
+class ScheduleEntry:
+    """A rendered on-call shift."""
+
+    start: datetime
+    end: datetime
+    user_id: str | None
+    user_summary: str | None
+
+    @classmethod
+    def from_api(cls, data):
+        """Project a rendered schedule entry from the REST API."""
+        user = data.get("user") or {}
+        return cls(
+            _parse_datetime(data.get("start")),
+            _parse_datetime(data.get("end")),
+            user.get("id"),
+            user.get("summary"),
+        )
+
+
+@dataclass(slots=True, frozen=True)
+class Schedule:
+    """An on-call schedule with its rendered final schedule entries."""
+
+    id: str
+    name: str | None
+    entries: tuple[ScheduleEntry, ...]
+
+    @classmethod
+    def from_api(cls, data):
+        """Project a schedule from the REST API.
+
+        Uses the final schedule, falling back to the first layer.
+        """
+        entries = (data.get("final_schedule") or {}).get(
+            "rendered_schedule_entries"
+        ) or (data.get("schedule_layers") or [{}])[0].get(
+            "rendered_schedule_entries", []
+        )
+        return cls(
+            data["id"],
+            data.get("name"),
+            tuple(
+                entry
+                for entry in map(ScheduleEntry.from_api, entries)
+                if entry.start and entry.end
+            ),
+        )
+
+    def to_storage(self):
+        """Return the record as a list for storage."""
+        return [
+            self.id,
+            self.name,
+            [
+                [
+                    entry.start.isoformat(),
+                    entry.end.isoformat(),
+                    entry.user_id,
+                    entry.user_summary,
+                ]
+                for entry in self.entries
+            ],
+        ]
+
+    @classmethod
+    def from_storage(cls, values):
+        """Restore a record stored by to_storage."""
+        schedule_id, name, entries = values
+        return cls(
+            schedule_id,
+            name,
+            tuple(
+                ScheduleEntry(
+                    _parse_datetime(start),
+                    _parse_datetime(end),
+                    user_id,
+                    user_summary,
+                )
+                for start, end, user_id, user_summary in entries
+            ),
+        )
@@ -1,11 +1,44 @@
+import asyncio
+import hashlib
+import json
 import logging
-from pagerduty import RestApiV2Client, EventsApiV2Client, Error
+import random
+import time
+import uuid
+from collections import defaultdict
 from homeassistant.components.notify import BaseNotificationService
-from .const import DOMAIN
+from homeassistant.core import callback
+from homeassistant.helpers.storage import Store
+from .api import (
+    PagerDutyApiError,
+    PagerDutyEventsClient,
+    events_base_url_for,
+    get_api_client,
+)
+from .const import (
+    DOMAIN,
+    CONF_NOTIFY_COALESCE_WINDOW,
+    DEFAULT_NOTIFY_COALESCE_WINDOW,
+    METRIC_NOTIFY_QUEUE_DEPTH,
+    METRIC_NOTIFY_DISPATCH_LATENCY,
+    METRIC_NOTIFY_SPOOL_AGE,
+    METRIC_NOTIFY_COALESCED,
+)
+from .metrics import PagerDutyMetrics
 
 _LOGGER = logging.getLogger(__name__)
 
 CONF_API_KEY = "api_key"
+STORAGE_VERSION = 1
+INTEGRATION_KEY_TTL = 24 * 60 * 60
+SEVERITIES = ["critical", "error", "warning", "info"]
+SPOOL_SIZE = 500
+SPOOL_MAX_AGE = 24 * 60 * 60
+SPOOL_SAVE_DELAY = 1
+DRAIN_RATE = 2
+DISPATCH_WORKERS = 4
+DISPATCH_BACKOFF_BASE = 1
+DISPATCH_BACKOFF_MAX = 300
 
 
 async def async_get_service(hass, config, discovery_info=None):
@@ -15,55 +48,492 @@ async def async_get_service(hass, config, discovery_info=None):
 
     api_key = discovery_info[CONF_API_KEY]
     api_base_url = discovery_info.get("api_base_url")
+    entry_id = discovery_info.get("entry_id", "default")
 
-    session = RestApiV2Client(api_key)
-    session.url = api_base_url
-    return PagerDutyNotificationService(session, api_base_url)
+    entry_data = hass.data.get(DOMAIN, {}).get(entry_id, {})
+    metrics = entry_data.get("metrics")
+    session = get_api_client(hass, api_key, api_base_url, metrics)
+    integration_keys = IntegrationKeyCache(hass, session, entry_id)
+    spool = NotificationSpool(
+        hass,
+        entry_id,
+        discovery_info.get(
+            CONF_NOTIFY_COALESCE_WINDOW, DEFAULT_NOTIFY_COALESCE_WINDOW
+        ),
+    )
+    previous = entry_data.pop("notifier", None)
+    if previous is not None:
+        await previous.async_stop()
+    await spool.async_load()
+    service = PagerDutyNotificationService(
+        hass,
+        session,
+        api_base_url,
+        integration_keys,
+        metrics or PagerDutyMetrics(),
+        spool,
+    )
+    if entry_data:
+        entry_data["notifier"] = service
+    service.async_start_drain()
+    return service
+
+
+def integration_keys_storage_key(entry_id):
+    """Return the storage key of an entry's integration key cache."""
+    return f"{DOMAIN}.{entry_id}.integration_keys"
+
+
+def notify_spool_storage_key(entry_id):
+    """Return the storage key of an entry's notification spool."""
+    return f"{DOMAIN}.{entry_id}.notify_spool"
+
+
+def is_retryable(error):
+    """Return whether a failed Events API request is worth retrying."""
+    return error.status is None or error.status == 429 or error.status >= 500
+
+
+def is_rejected_integration_key(error):
+    """Return whether an Events API error means the routing key is invalid."""
+    if error.status == 404:
+        return True
+    return error.status == 400 and "routing" in str(error).lower()
+
+
+class IntegrationKeyCache:
+    """Persistent cache of Events API integration keys by service ID.
+
+    Lookups for the same service are serialized, so concurrent sends share
+    one lookup and never create duplicate integrations.
+    """
+
+    def __init__(self, hass, session, entry_id):
+        """Initialize the cache."""
+        self.session = session
+        self._store = Store(
+            hass, STORAGE_VERSION, integration_keys_storage_key(entry_id)
+        )
+        self._keys = None
+        self._load_lock = asyncio.Lock()
+        self._service_locks = defaultdict(asyncio.Lock)
+
+    async def _async_load(self):
+        """Load the stored keys once."""
+        async with self._load_lock:
+            if self._keys is None:
+                self._keys = await self._store.async_load() or {}
+        return self._keys
+
+    @callback
+    def _async_schedule_save(self):
+        """Save the keys shortly."""
+        self._store.async_delay_save(lambda: self._keys, 10)
+
+    async def async_get(self, service_id):
+        """Return the integration key of a service, looking it up if needed."""
+        keys = await self._async_load()
+        async with self._service_locks[service_id]:
+            cached = keys.get(service_id)
+            now = time.time()
+            if cached and now - cached["fetched_at"] < INTEGRATION_KEY_TTL:
+                return cached["integration_key"]
+
+            integration_key = await get_integration_key(
+                self.session, service_id
+            )
+            if integration_key:
+                keys[service_id] = {
+                    "integration_key": integration_key,
+                    "fetched_at": now,
+                }
+                self._async_schedule_save()
+            return integration_key
+
+    async def async_invalidate(self, service_id):
+        """Forget the cached integration key of a service."""
+        keys = await self._async_load()
+        if keys.pop(service_id, None) is not None:
+            self._async_schedule_save()
+
+
+def _fingerprint(*values):
+    """Return a short hash identifying identical messages."""
+    encoded = json.dumps(values, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()[:16]
+
+
+class NotificationSpool:
+    """Outgoing events kept in storage until PagerDuty has accepted them.
+
+    Identical messages within the coalesce window share one dedup_key, so
+    PagerDuty groups them into one alert, and are not spooled again while
+    the first one is still waiting to be sent.
+    """
+
+    def __init__(self, hass, entry_id, coalesce_window):
+        """Initialize the spool."""
+        self._store = Store(
+            hass, STORAGE_VERSION, notify_spool_storage_key(entry_id)
+        )
+        self.coalesce_window = coalesce_window
+        self.events = []
+        self._recent = {}
+
+    async def async_load(self):
+        """Load the events spooled before a restart."""
+        stored = await self._store.async_load() or {}
+        self.events = stored.get("events", [])
+        self._recent = stored.get("recent", {})
+        if self.events:
+            _LOGGER.info(
+                f"Loaded {len(self.events)} spooled PagerDuty notifications"
+            )
+
+    @callback
+    def _async_schedule_save(self):
+        """Save the spool shortly."""
+        self._store.async_delay_save(
+            lambda: {"events": self.events, "recent": self._recent},
+            SPOOL_SAVE_DELAY,
+        )
+
+    @callback
+    def async_add(self, service_id, summary, severity, dedup_key, details):
+        """Spool an event, or coalesce it into a spooled identical one.
+
+        Returns whether the message was coalesced.
+        """
+        now = time.time()
+        if self.coalesce_window:
+            self._recent = {
+                fingerprint: recent
+                for fingerprint, recent in self._recent.items()
+                if now - recent[1] < self.coalesce_window
+            }
+            fingerprint = _fingerprint(
+                service_id, summary, severity, dedup_key, details
+            )
+            recent = self._recent.get(fingerprint)
+            if recent is not None:
+                for event in self.events:
+                    if event["fingerprint"] == fingerprint:
+                        event["count"] += 1
+                        self._async_schedule_save()
+                        return True
+                dedup_key = recent[0]
+            else:
+                dedup_key = dedup_key or uuid.uuid4().hex
+                self._recent[fingerprint] = [dedup_key, now]
+        else:
+            fingerprint = None
+
+        if len(self.events) >= SPOOL_SIZE:
+            _LOGGER.error(
+                f"PagerDuty notification spool is full, dropping message for service_id {service_id}"
+            )
+            return False
+        self.events.append(
+            {
+                "service_id": service_id,
+                "summary": summary,
+                "severity": severity,
+                "dedup_key": dedup_key,
+                "custom_details": details,
+                "fingerprint": fingerprint,
+                "count": 1,
+                "queued_at": now,
+            }
+        )
+        self._async_schedule_save()
+        return False
+
+    @callback
+    def async_record_attempt(self, event):
+        """Count a failed attempt to send an event and return the count."""
+        event["attempts"] = event.get("attempts", 0) + 1
+        self._async_schedule_save()
+        return event["attempts"]
+
+    @callback
+    def async_remove(self, event):
+        """Drop an event that was sent or given up on."""
+        self.events.remove(event)
+        self._async_schedule_save()
+
+    async def async_flush(self):
+        """Save the spool right away."""
+        await self._store.async_save(
+            {"events": self.events, "recent": self._recent}
+        )
+
+    def age(self):
+        """Return the seconds the oldest event has been waiting."""
+        if not self.events:
+            return 0
+        return round(time.time() - self.events[0]["queued_at"])
 
 
 class PagerDutyNotificationService(BaseNotificationService):
-    def __init__(self, session, api_base_url):
+    def __init__(
+        self, hass, session, api_base_url, integration_keys, metrics, spool
+    ):
         """Initialize the service."""
+        self.hass = hass
         self.session = session
         self.api_base_url = api_base_url
+        self.integration_keys = integration_keys
+        self.metrics = metrics
+        self.spool = spool
+        self._workers = []
+        self._sending = set()
+        self._retry_at = {}
+        self._next_send_at = 0
+        self._wakeup = asyncio.Event()
+        self._stopped = False
+        self._events_clients = {}
 
-    def send_message(self, message="", **kwargs):
-        """Send a message to PagerDuty."""
-        service_id = kwargs.get("data", {}).get("service_id")
+    async def async_send_message(self, message="", **kwargs):
+        """Spool a message for delivery to PagerDuty."""
+        data = kwargs.get("data") or {}
+        service_id = data.get("service_id")
         if not service_id:
             _LOGGER.error(
                 "Service ID not provided for PagerDuty notification."
             )
             return
 
-        integration_key = get_integration_key(self.session, service_id)
-        if not integration_key:
+        severity = data.get("severity", "critical")
+        if severity not in SEVERITIES:
             _LOGGER.error(
-                f"Failed to retrieve PagerDuty integration key for service_id: {service_id}"
+                f"Invalid PagerDuty severity {severity}, expected one of {SEVERITIES}"
             )
             return
 
-        events_api_base_url = (
-            "https://events.pagerduty.com"
-            if self.api_base_url == "https://api.pagerduty.com"
-            else "https://events.eu.pagerduty.com"
-        )
-        event_session = EventsApiV2Client(integration_key)
-        event_session.url = events_api_base_url
+        if self._stopped:
+            _LOGGER.error(
+                f"PagerDuty integration is not loaded, dropping message for service_id {service_id}"
+            )
+            return
+
+        if self.spool.async_add(
+            service_id,
+            message,
+            severity,
+            data.get("dedup_key"),
+            data.get("custom_details"),
+        ):
+            _LOGGER.debug(
+                f"Coalesced PagerDuty notification for service_id {service_id}"
+            )
+            self.metrics.increment(METRIC_NOTIFY_COALESCED)
+        self.async_start_drain()
+        self._async_update_spool_metrics()
+
+    @callback
+    def async_start_drain(self):
+        """Start dispatch workers for spooled events, up to DISPATCH_WORKERS."""
+        self._wakeup.set()
+        if self._stopped or not self.spool.events:
+            return
+        self._workers = [task for task in self._workers if not task.done()]
+        while len(self._workers) < min(
+            DISPATCH_WORKERS, len(self.spool.events)
+        ):
+            self._workers.append(
+                self.hass.async_create_background_task(
+                    self._async_worker(),
+                    f"{DOMAIN}_notify_worker_{len(self._workers)}",
+                )
+            )
+
+    async def async_stop(self):
+        """Stop the dispatch workers and save the spool."""
+        self._stopped = True
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        await self.spool.async_flush()
+
+    @callback
+    def _async_update_spool_metrics(self):
+        """Publish the current spool depth and age."""
+        self.metrics.set(METRIC_NOTIFY_QUEUE_DEPTH, len(self.spool.events))
+        self.metrics.set(METRIC_NOTIFY_SPOOL_AGE, self.spool.age())
+        self.metrics.async_notify()
+
+    @callback
+    def _async_next_event(self):
+        """Return the oldest event that can be sent now, if any.
+
+        Events of a service that is being sent to or backing off wait, so
+        each service gets its events in order, while other services go on.
+        Events spooled for longer than SPOOL_MAX_AGE are dropped.
+        """
+        now = time.monotonic()
+        for event in list(self.spool.events):
+            service_id = event["service_id"]
+            if service_id in self._sending:
+                continue
+            if time.time() - event["queued_at"] > SPOOL_MAX_AGE:
+                _LOGGER.error(
+                    f"Dropping PagerDuty notification for service_id {service_id} spooled for over {SPOOL_MAX_AGE}s"
+                )
+                self.spool.async_remove(event)
+                continue
+            if self._retry_at.get(service_id, 0) > now:
+                continue
+            return event
+        return None
+
+    def _retry_delay(self):
+        """Return the seconds until a backing off service can be retried."""
+        pending = {event["service_id"] for event in self.spool.events}
+        retry_at = [
+            at
+            for service_id, at in self._retry_at.items()
+            if service_id in pending and service_id not in self._sending
+        ]
+        if not retry_at:
+            return None
+        return max(0, min(retry_at) - time.monotonic())
+
+    async def _async_pace(self):
+        """Wait for the next send slot, at most DRAIN_RATE per second."""
+        now = time.monotonic()
+        send_at = max(now, self._next_send_at)
+        self._next_send_at = send_at + 1 / DRAIN_RATE
+        if send_at > now:
+            await asyncio.sleep(send_at - now)
+
+    async def _async_worker(self):
+        """Send spooled events until none is left.
+
+        A service whose events fail with a transient error is retried with
+        capped exponential backoff, including after a restart, until the
+        event has been spooled for SPOOL_MAX_AGE. Events failing otherwise
+        are given up on right away.
+        """
+        while self.spool.events:
+            event = self._async_next_event()
+            if event is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(
+                        self._wakeup.wait(), self._retry_delay()
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            service_id = event["service_id"]
+            self._sending.add(service_id)
+            try:
+                await self._async_pace()
+                await self._async_dispatch(event)
+            except PagerDutyApiError as e:
+                attempts = self.spool.async_record_attempt(event)
+                delay = random.uniform(
+                    0,
+                    min(
+                        DISPATCH_BACKOFF_MAX,
+                        DISPATCH_BACKOFF_BASE * 2 ** min(attempts, 10),
+                    ),
+                )
+                self._retry_at[service_id] = time.monotonic() + delay
+                _LOGGER.debug(
+                    f"Retrying PagerDuty notification for service_id {service_id} in {delay:.1f}s: {e}"
+                )
+                self._async_update_spool_metrics()
+                continue
+            except Exception as e:
+                _LOGGER.exception(
+                    f"Unexpected error sending to PagerDuty: {e}"
+                )
+            finally:
+                self._sending.discard(service_id)
+                self._wakeup.set()
+
+            self._retry_at.pop(service_id, None)
+            self.spool.async_remove(event)
+            self.metrics.set(
+                METRIC_NOTIFY_DISPATCH_LATENCY,
+                round((time.time() - event["queued_at"]) * 1000),
+            )
+            self._async_update_spool_metrics()
+        self._wakeup.set()
+
+    def _events_client(self, integration_key):
+        """Return the reusable Events API client for an integration key."""
+        client = self._events_clients.get(integration_key)
+        if client is None:
+            client = PagerDutyEventsClient(
+                self.hass,
+                integration_key,
+                events_base_url_for(self.api_base_url),
+            )
+            self._events_clients[integration_key] = client
+        return client
+
+    async def _async_dispatch(self, event):
+        """Send a spooled event.
+
+        Raises PagerDutyApiError on transient failures; other failures are
+        logged and the event is given up on.
+        """
+        service_id = event["service_id"]
+        key_refreshed = False
+        while True:
+            try:
+                integration_key = await self.integration_keys.async_get(
+                    service_id
+                )
+            except PagerDutyApiError as e:
+                if is_retryable(e):
+                    raise
+                _LOGGER.error(
+                    f"Failed to look up integrations for service_id {service_id}: {e}"
+                )
+                return
+
+            if not integration_key:
+                _LOGGER.error(
+                    f"Failed to retrieve PagerDuty integration key for service_id: {service_id}"
+                )
+                return
 
-        source = "Home Assistant"
+            source = "Home Assistant"
 
-        try:
-            event_session.trigger(message, source)
-            _LOGGER.debug("Sent notification to PagerDuty")
-        except Error as e:
-            _LOGGER.error(f"Failed to send notification to PagerDuty: {e}")
+            try:
+                await self._events_client(integration_key).trigger(
+                    event["summary"],
+                    source,
+                    severity=event["severity"],
+                    dedup_key=event["dedup_key"],
+                    custom_details=event["custom_details"],
+                )
+                _LOGGER.debug("Sent notification to PagerDuty")
+                return
+            except PagerDutyApiError as e:
+                if not key_refreshed and is_rejected_integration_key(e):
+                    _LOGGER.warning(
+                        f"Integration key for service_id {service_id} was rejected, looking it up again: {e}"
+                    )
+                    key_refreshed = True
+                    self._events_clients.pop(integration_key, None)
+                    await self.integration_keys.async_invalidate(service_id)
+                    continue
+                if is_retryable(e):
+                    raise
+                _LOGGER.error(f"Failed to send notification to PagerDuty: {e}")
+                return
 
 
-def get_integration_key(session, service_id):
+async def get_integration_key(session, service_id):
     """Retrieve or create integration key for the given service."""
     _LOGGER.debug(f"Retrieving integrations for service ID: {service_id}")
-    service_details = session.rget(f"/services/{service_id}")
+    service_details = await session.rget(f"/services/{service_id}")
     _LOGGER.debug(f"Service details received: {service_details}")
     integrations = service_details.get("integrations", [])
     _LOGGER.debug(f"Integrations in service: {integrations}")
@@ -71,7 +541,7 @@ def get_integration_key(session, service_id):
     for integration in integrations:
         if "events_api_v2_inbound_integration" in integration["type"]:
             integration_id = integration["id"]
-            integration_details = session.rget(
+            integration_details = await session.rget(
                 f"/services/{service_id}/integrations/{integration_id}"
             )
             _LOGGER.debug(f"Integration details: {integration_details}")
@@ -81,8 +551,9 @@ def get_integration_key(session, service_id):
         "type": "events_api_v2_inbound_integration",
         "name": "Home Assistant Integration",
     }
-    created_integration = session.rpost(
-        f"/services/{service_id}/integrations", json=new_integration
+    created_integration = await session.rpost(
+        f"/services/{service_id}/integrations",
+        json={"integration": new_integration},
     )
     _LOGGER.debug(f"Created new integration: {created_integration}")
     return created_integration.get("integration_key")
@@ -0,0 +1,117 @@
+"""Rendered PagerDuty schedules for arbitrary date ranges."""
+
+import logging
+from collections import OrderedDict
+from datetime import timedelta
+from homeassistant.core import callback
+from homeassistant.util import dt as dt_util
+from .api import gather_bounded
+from .models import Schedule
+
+_LOGGER = logging.getLogger(__name__)
+
+SCHEDULE_WINDOW_CACHE_SIZE = 32
+SCHEDULE_WINDOW_TTL = timedelta(minutes=15)
+
+
+class ScheduleWindowCache:
+    """Schedules rendered for date ranges, cached with LRU eviction.
+
+    Windows are keyed by schedule, date range and time zone. A schedule's
+    windows are dropped when its regularly polled render changes, which is
+    how edits and overrides show up, and every window expires after
+    SCHEDULE_WINDOW_TTL for changes outside the polled range.
+    """
+
+    def __init__(self, session, concurrency):
+        """Initialize the cache."""
+        self.session = session
+        self.concurrency = concurrency
+        self._windows = OrderedDict()
+        self._polled = {}
+
+    async def async_fetch(self, schedule_ids, since, until, time_zone):
+        """Render schedules for a date range, skipping ones that fail."""
+        params = {
+            "time_zone": time_zone,
+            "since": since.isoformat(),
+            "until": until.isoformat(),
+        }
+        results = await gather_bounded(
+            self.concurrency,
+            [
+                self.session.rget(f"/schedules/{schedule_id}", params=params)
+                for schedule_id in schedule_ids
+            ],
+        )
+
+        schedules = []
+        for schedule_id, schedule_data in zip(schedule_ids, results):
+            if isinstance(schedule_data, Exception):
+                _LOGGER.warning(
+                    f"Failed to fetch schedule {schedule_id}, skipping: {schedule_data}"
+                )
+                continue
+            if schedule_data:
+                schedules.append(Schedule.from_api(schedule_data))
+                _LOGGER.debug(
+                    f"Fetched schedule for schedule_id {schedule_id}: {schedule_data}"
+                )
+        return schedules
+
+    async def async_get(self, schedule_ids, since, until, time_zone):
+        """Return schedules rendered for a date range, fetching missing ones."""
+        now = dt_util.utcnow()
+        schedules = {}
+        missing = []
+        for schedule_id in schedule_ids:
+            key = (schedule_id, since, until, time_zone)
+            cached = self._windows.get(key)
+            if cached is not None and now - cached[0] < SCHEDULE_WINDOW_TTL:
+                self._windows.move_to_end(key)
+                schedules[schedule_id] = cached[1]
+            else:
+                missing.append(schedule_id)
+
+        if missing:
+            _LOGGER.debug(
+                f"Rendering schedules {missing} from {since} until {until}"
+            )
+            for schedule in await self.async_fetch(
+                missing, since, until, time_zone
+            ):
+                self._windows[(schedule.id, since, until, time_zone)] = (
+                    now,
+                    schedule,
+                )
+                schedules[schedule.id] = schedule
+            while len(self._windows) > SCHEDULE_WINDOW_CACHE_SIZE:
+                self._windows.popitem(last=False)
+
+        return [
+            schedules[schedule_id]
+            for schedule_id in schedule_ids
+            if schedule_id in schedules
+        ]
+
+    @callback
+    def async_observe(self, schedules, since):
+        """Drop the windows of schedules whose polled render changed."""
+        for schedule in schedules:
+            previous = self._polled.get(schedule.id)
+            if previous is not None and previous[0] == since:
+                if previous[1] != schedule.entries:
+                    self.async_invalidate(schedule.id)
+            self._polled[schedule.id] = (since, schedule.entries)
+
+    @callback
+    def async_invalidate(self, schedule_id=None):
+        """Drop the cached windows of a schedule, or of every schedule."""
+        for key in list(self._windows):
+            if schedule_id is None or key[0] == schedule_id:
+                del self._windows[key]
+        if schedule_id is None:
+            self._polled.clear()
+        _LOGGER.debug(
+            f"Invalidated schedule windows of {schedule_id or 'all'}"
+        )
@@ -1,22 +1,41 @@
 import logging
-from collections import defaultdict
 from homeassistant.components.sensor import SensorEntity
+from homeassistant.const import EntityCategory
+from homeassistant.core import callback
+from homeassistant.helpers import entity_registry as er
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
-from .const import DOMAIN
+from .const import (
+    DOMAIN,
+    METRIC_ENTITIES_WRITTEN,
+    METRIC_NOTIFY_QUEUE_DEPTH,
+    METRIC_NOTIFY_DISPATCH_LATENCY,
+    METRIC_NOTIFY_SPOOL_AGE,
+    METRIC_API_REQUESTS,
+    METRIC_API_PAGES,
+    METRIC_API_BYTES,
+    METRIC_API_RETRIES,
+    METRIC_API_THROTTLED,
+    METRIC_API_SHARED,
+    PHASES,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
+MAX_ASSIGNED_INCIDENT_ATTRIBUTES = 20
+MAX_DESCRIPTION_LENGTH = 255
+
 
 async def async_setup_entry(hass, entry, async_add_entities):
     """Set up PagerDuty sensors from a config entry."""
     coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    metrics = hass.data[DOMAIN][entry.entry_id]["metrics"]
     user_id = coordinator.data.get("user_id", "")
 
     sensor_descriptions = [
         {
             "key": "total_incidents",
             "name": "PagerDuty Total Incidents",
-            "value_fn": lambda data: len(data.get("incidents", [])),
+            "value_fn": lambda data: data["index"].total.count,
             "unique_id": f"pagerduty_total_incidents{user_id}",
             "attribute_fn": lambda data: calculate_attributes(data, None),
             "native_unit_of_measurement": "incidents",
@@ -25,12 +44,7 @@ async def async_setup_entry(hass, entry, async_add_entities):
         {
             "key": "assigned_incidents",
             "name": "PagerDuty Assigned Incidents",
-            "value_fn": lambda data: sum(
-                1
-                for incident in data.get("incidents", [])
-                for assignee in incident.get("assignments", [])
-                if assignee.get("assignee", {}).get("id") == user_id
-            ),
+            "value_fn": lambda data: data["index"].assignee(user_id).count,
             "unique_id": f"pagerduty_assigned_{user_id}",
             "attribute_fn": lambda data: calculate_assigned_incidents_attributes(
                 data, user_id
@@ -40,89 +54,256 @@ async def async_setup_entry(hass, entry, async_add_entities):
         },
     ]
 
-    services_data = coordinator.data.get("services", [])
-    for service in services_data:
-        service_id = service["id"]
-        service_name = service["summary"]
-        team_name = service["team_name"]
-        team_id = service["team_id"]
-        if team_id:
-            unique_id = f"pagerduty_{team_id}_{service_id}"
-        else:
-            unique_id = f"pagerduty_{service_id}"
-        if team_name:
-            _LOGGER.debug("User is part of team, using team_name")
-            sensor_name = f"PD-{team_name}-{service_name}"
-        else:
-            _LOGGER.debug("Skipping team name")
-            sensor_name = f"PD-{service_name}"
-        sensor_descriptions.append(
+    metric_descriptions = [
+        {
+            "key": METRIC_ENTITIES_WRITTEN,
+            "name": "PagerDuty Entities Written",
+            "unique_id": f"pagerduty_metric_{METRIC_ENTITIES_WRITTEN}_{user_id}",
+            "native_unit_of_measurement": "entities",
+            "state_class": "measurement",
+        },
+        {
+            "key": METRIC_NOTIFY_QUEUE_DEPTH,
+            "name": "PagerDuty Notification Queue Depth",
+            "unique_id": f"pagerduty_metric_{METRIC_NOTIFY_QUEUE_DEPTH}_{user_id}",
+            "native_unit_of_measurement": "notifications",
+            "state_class": "measurement",
+        },
+        {
+            "key": METRIC_NOTIFY_DISPATCH_LATENCY,
+            "name": "PagerDuty Notification Dispatch Latency",
+            "unique_id": f"pagerduty_metric_{METRIC_NOTIFY_DISPATCH_LATENCY}_{user_id}",
+            "native_unit_of_measurement": "ms",
+            "state_class": "measurement",
+        },
+        {
+            "key": METRIC_NOTIFY_SPOOL_AGE,
+            "name": "PagerDuty Notification Spool Age",
+            "unique_id": f"pagerduty_metric_{METRIC_NOTIFY_SPOOL_AGE}_{user_id}",
+            "native_unit_of_measurement": "s",
+            "state_class": "measurement",
+        },
+    ]
+    for phase in PHASES:
+        metric_descriptions.append(
             {
-                "key": f"service_{service_id}",
-                "name": sensor_name,
-                "value_fn": lambda data, service_id=service_id: sum(
-                    1
-                    for incident in data.get("incidents", [])
-                    if incident["service"]["id"] == service_id
-                ),
-                "unique_id": unique_id,
-                "attribute_fn": lambda data, service_id=service_id: calculate_attributes(
-                    data, service_id
-                ),
-                "native_unit_of_measurement": "incidents",
+                "key": phase,
+                "name": f"PagerDuty {phase.replace('_', ' ').capitalize()} Duration",
+                "unique_id": f"pagerduty_metric_{phase}_{user_id}",
+                "native_unit_of_measurement": "ms",
                 "state_class": "measurement",
+                "percentiles": True,
+                "enabled_default": False,
+            }
+        )
+    for key, name, unit in (
+        (METRIC_API_REQUESTS, "Requests", "requests"),
+        (METRIC_API_PAGES, "Pages", "pages"),
+        (METRIC_API_BYTES, "Bytes Received", "B"),
+        (METRIC_API_RETRIES, "Retries", "requests"),
+        (METRIC_API_THROTTLED, "Rate Limited Responses", "requests"),
+        (METRIC_API_SHARED, "Shared Responses", "requests"),
+    ):
+        metric_descriptions.append(
+            {
+                "key": key,
+                "name": f"PagerDuty API {name}",
+                "unique_id": f"pagerduty_metric_{key}_{user_id}",
+                "native_unit_of_measurement": unit,
+                "state_class": "total_increasing",
+                "enabled_default": False,
             }
         )
 
     sensors = [
         PagerDutySensor(coordinator, desc) for desc in sensor_descriptions
     ]
+    sensors.extend(
+        PagerDutyMetricSensor(coordinator, metrics, desc)
+        for desc in metric_descriptions
+    )
     _LOGGER.debug("PagerDuty sensors created: %s", sensors)
-    async_add_entities(sensors, True)
+    async_add_entities(sensors)
 
+    service_sensors = {}
+    seen_services = None
 
-def calculate_attributes(data, service_id):
-    """Calculate attributes for a sensor."""
+    @callback
+    def async_update_service_sensors():
+        """Add sensors for new services and remove those of deleted ones.
+
+        Runs when the services list was refetched, and only touches the
+        sensors of services that were added, removed or changed team. With
+        incident statistics enabled, every service and team also gets
+        statistics sensors.
+        """
+        nonlocal seen_services
+        services = (coordinator.data or {}).get("services")
+        if services is None or services is seen_services:
+            return
+        seen_services = services
+        descriptions = {
+            description["unique_id"]: description
+            for description in map(service_sensor_description, services)
+        }
+        if coordinator.statistics is not None:
+            teams = {}
+            for service in services:
+                descriptions.update(
+                    statistics_sensor_descriptions(
+                        coordinator.statistics,
+                        user_id,
+                        ("service", service.id),
+                        service.summary,
+                    )
+                )
+                if service.team_id:
+                    teams[service.team_id] = service.team_name
+            for team_id, team_name in teams.items():
+                descriptions.update(
+                    statistics_sensor_descriptions(
+                        coordinator.statistics,
+                        user_id,
+                        ("team", team_id),
+                        team_name or team_id,
+                    )
+                )
+
+        for unique_id in service_sensors.keys() - descriptions.keys():
+            registry = er.async_get(hass)
+            entity = service_sensors.pop(unique_id)
+            _LOGGER.debug(f"Removing sensor of deleted item: {unique_id}")
+            entity_id = registry.async_get_entity_id(
+                "sensor", DOMAIN, unique_id
+            )
+            registry_entry = entity_id and registry.async_get(entity_id)
+            if (
+                registry_entry
+                and registry_entry.config_entry_id == entry.entry_id
+            ):
+                registry.async_remove(entity_id)
+            elif entity.hass:
+                hass.async_create_task(entity.async_remove())
+
+        added = []
+        for unique_id in descriptions.keys() - service_sensors.keys():
+            entity = PagerDutySensor(coordinator, descriptions[unique_id])
+            service_sensors[unique_id] = entity
+            added.append(entity)
+        if added:
+            _LOGGER.debug(f"Adding {len(added)} service and team sensors")
+            async_add_entities(added)
+
+    async_update_service_sensors()
+    entry.async_on_unload(
+        coordinator.async_add_listener(async_update_service_sensors)
+    )
+
+
+def service_sensor_description(service):
+    """Return the sensor description of a service."""
+    service_id = service.id
+    service_name = service.summary
+    team_name = service.team_name
+    team_id = service.team_id
+    if team_id:
+        unique_id = f"pagerduty_{team_id}_{service_id}"
+    else:
+        unique_id = f"pagerduty_{service_id}"
+    if team_name:
+        sensor_name = f"PD-{team_name}-{service_name}"
+    else:
+        sensor_name = f"PD-{service_name}"
+    return {
+        "key": f"service_{service_id}",
+        "name": sensor_name,
+        "value_fn": lambda data: data["index"].service(service_id).count,
+        "unique_id": unique_id,
+        "attribute_fn": lambda data: calculate_attributes(data, service_id),
+        "native_unit_of_measurement": "incidents",
+        "state_class": "measurement",
+    }
+
+
+def statistics_sensor_descriptions(statistics, user_id, key, name):
+    """Return statistics sensor descriptions keyed by unique ID.
 
-    urgency_counts = defaultdict(int)
-    status_counts = defaultdict(int)
-    for incident in data.get("incidents", []):
-        if service_id is None or incident["service"]["id"] == service_id:
-            urgency = incident.get("urgency", "unknown")
-            status = incident.get("status", "unknown")
-            urgency_counts[urgency] += 1
-            status_counts[status] += 1
+    The key is a ("service", ID) or ("team", ID) pair. Unique IDs include
+    the user, so entries of several users on one account do not collide.
+    """
+    kind, item_id = key
+    descriptions = [
+        {
+            "key": f"{kind}_{item_id}_mean_time_to_acknowledge",
+            "name": f"PD-{name} Mean Time to Acknowledge",
+            "value_fn": lambda data: statistics.mean_time_to_acknowledge(key),
+            "native_unit_of_measurement": "min",
+        },
+        {
+            "key": f"{kind}_{item_id}_mean_time_to_resolve",
+            "name": f"PD-{name} Mean Time to Resolve",
+            "value_fn": lambda data: statistics.mean_time_to_resolve(key),
+            "native_unit_of_measurement": "min",
+        },
+        {
+            "key": f"{kind}_{item_id}_incidents_per_hour",
+            "name": f"PD-{name} Incidents per Hour",
+            "value_fn": lambda data: statistics.incidents_per_hour(key),
+            "native_unit_of_measurement": "incidents/h",
+        },
+    ]
     return {
-        "urgency_low": urgency_counts["low"],
-        "urgency_high": urgency_counts["high"],
-        "status_triggered": status_counts["triggered"],
-        "status_acknowledged": status_counts["acknowledged"],
+        f"pagerduty_{description['key']}_{user_id}": {
+            **description,
+            "unique_id": f"pagerduty_{description['key']}_{user_id}",
+            "attribute_fn": lambda data: None,
+            "state_class": "measurement",
+        }
+        for description in descriptions
     }
 
 
+def calculate_attributes(data, service_id):
+    """Calculate attributes for a sensor."""
+    index = data["index"]
+    if service_id is None:
+        return index.total.attributes()
+    return index.service(service_id).attributes()
+
+
 def calculate_assigned_incidents_attributes(data, user_id):
-    """Calculate attributes for assigned incidents."""
+    """Calculate attributes for assigned incidents.
+
+    Only the first MAX_ASSIGNED_INCIDENT_ATTRIBUTES incidents are listed,
+    with shortened descriptions; the pagerduty.get_incidents service
+    returns all of them in full.
+    """
+    incidents = data["index"].assigned_to(user_id)
     assigned_incidents = []
-    for incident in data.get("incidents", []):
-        for assignee in incident.get("assignments", []):
-            if assignee.get("assignee", {}).get("id") == user_id:
-                incident_to_add = {
-                    "impacted_service": incident["service"].get(
-                        "summary", "Unknown"
-                    )
-                    if "service" in incident
-                    else "Unknown",
-                    "title": incident.get("title", "Unknown"),
-                    "description": incident.get("description", "Unknown"),
-                    "status": incident.get("status", "Unknown"),
-                }
-                assigned_incidents.append(incident_to_add)
-    return {"assigned_incidents": assigned_incidents}
+    for incident in incidents[:MAX_ASSIGNED_INCIDENT_ATTRIBUTES]:
+        incident_to_add = {
+            "incident_id": incident.id,
+            "impacted_service": incident.service_summary or "Unknown",
+            "title": incident.title or "Unknown",
+            "description": (incident.description or "Unknown")[
+                :MAX_DESCRIPTION_LENGTH
+            ],
+            "status": incident.status or "Unknown",
+        }
+        assigned_incidents.append(incident_to_add)
+    return {
+        "assigned_incidents": assigned_incidents,
+        "assigned_incidents_omitted": len(incidents) - len(assigned_incidents),
+    }
 
 
 class PagerDutySensor(SensorEntity, CoordinatorEntity):
     """Generic sensor for PagerDuty incidents."""
 
+    _unrecorded_attributes = frozenset(
+        {"assigned_incidents", "assigned_incidents_omitted"}
+    )
+
     def __init__(self, coordinator, description):
         """Initialize the sensor."""
         super().__init__(coordinator)
@@ -134,8 +315,32 @@ class PagerDutySensor(SensorEntity, CoordinatorEntity):
             "native_unit_of_measurement"
         )
         self._state_class = description.get("state_class")
+        self._fingerprint = None
+        self._compute_state()
         _LOGGER.debug("Initialized PagerDuty sensor: %s", self._attr_name)
 
+    def _compute_state(self):
+        """Compute the value and attributes from coordinator data.
+
+        Returns whether they, or the availability, changed since the last
+        computation.
+        """
+        data = self.coordinator.data
+        self._value = self._value_fn(data) if data else None
+        self._attributes = self._attribute_fn(data) if data else None
+        fingerprint = (self.available, self._value, self._attributes)
+        changed = fingerprint != self._fingerprint
+        self._fingerprint = fingerprint
+        return changed
+
+    @callback
+    def _handle_coordinator_update(self):
+        """Write state only when the sensor's values changed."""
+        if not self._compute_state():
+            return
+        self.coordinator.metrics.increment(METRIC_ENTITIES_WRITTEN)
+        self.async_write_ha_state()
+
     @property
     def device_info(self):
         """Return device info for linking this entity to the unique PagerDuty device."""
@@ -150,20 +355,20 @@ class PagerDutySensor(SensorEntity, CoordinatorEntity):
     @property
     def native_value(self):
         """Return the state of the sensor."""
-        value = self._value_fn(self.coordinator.data)
-        _LOGGER.debug("Sensor '%s' native value: %s", self._attr_name, value)
-        return value
+        _LOGGER.debug(
+            "Sensor '%s' native value: %s", self._attr_name, self._value
+        )
+        return self._value
 
     @property
     def extra_state_attributes(self):
         """Return additional state attributes."""
-        attributes = self._attribute_fn(self.coordinator.data)
         _LOGGER.debug(
             "Sensor '%s' extra state attributes: %s",
             self._attr_name,
-            attributes,
+            self._attributes,
         )
-        return attributes
+        return self._attributes
 
     @property
     def native_unit_of_measurement(self):
@@ -174,3 +379,73 @@ class PagerDutySensor(SensorEntity, CoordinatorEntity):
     def state_class(self):
         """Return the state class of the sensor."""
         return self._state_class
+
+
+class PagerDutyMetricSensor(SensorEntity):
+    """Diagnostic sensor exposing one of the integration's own metrics."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_should_poll = False
+
+    def __init__(self, coordinator, metrics, description):
+        """Initialize the sensor."""
+        self.coordinator = coordinator
+        self.metrics = metrics
+        self._key = description["key"]
+        self._attr_name = description["name"]
+        self._attr_unique_id = description["unique_id"]
+        self._attr_native_unit_of_measurement = description.get(
+            "native_unit_of_measurement"
+        )
+        self._attr_state_class = description.get("state_class")
+        self._attr_entity_registry_enabled_default = description.get(
+            "enabled_default", True
+        )
+        self._percentiles = description.get("percentiles", False)
+        self._fingerprint = None
+
+    async def async_added_to_hass(self):
+        """Listen for metric updates."""
+        self._fingerprint = (self.native_value, self.extra_state_attributes)
+        self.async_on_remove(
+            self.metrics.async_add_listener(self._handle_metrics_update)
+        )
+
+    @callback
+    def _handle_metrics_update(self):
+        """Write state only when the sensor's values changed.
+
+        Writes are counted as entities written, except those of the
+        entities written sensor itself, which would otherwise change on
+        every update.
+        """
+        fingerprint = (self.native_value, self.extra_state_attributes)
+        if fingerprint == self._fingerprint:
+            return
+        self._fingerprint = fingerprint
+        if self._key != METRIC_ENTITIES_WRITTEN:
+            self.metrics.increment(METRIC_ENTITIES_WRITTEN)
+        self.async_write_ha_state()
+
+    @property
+    def device_info(self):
+        """Return device info for linking this entity to the unique PagerDuty device."""
+        unique_device_name = f"PagerDuty_{self.coordinator.data.get('user_id', 'default_user_id')}"
+        return {
+            "identifiers": {(DOMAIN, unique_device_name)},
+            "name": unique_device_name,
+            "manufacturer": "PagerDuty Inc.",
+            "via_device": (DOMAIN, unique_device_name),
+        }
+
+    @property
+    def native_value(self):
+        """Return the current metric value."""
+        return self.metrics.get(self._key)
+
+    @property
+    def extra_state_attributes(self):
+        """Return the rolling percentiles of sampled metrics."""
+        if self._percentiles:
+            return self.metrics.percentiles(self._key)
+        return None
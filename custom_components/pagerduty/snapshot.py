@@ -0,0 +1,110 @@
+"""Persisted snapshot of PagerDuty coordinator data."""
+
+import logging
+from homeassistant.core import callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.storage import Store
+from .const import DOMAIN
+from .models import Incident, Schedule, Service
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 3
+SNAPSHOT_SAVE_DELAY = 300
+
+
+def compact_snapshot(data):
+    """Return the parts of coordinator data the entities need at startup."""
+    return {
+        "user_id": data.get("user_id"),
+        "services": [
+            service.to_storage() for service in data.get("services", [])
+        ],
+        "incidents": [
+            incident.to_storage() for incident in data.get("incidents", [])
+        ],
+        "on_call_schedules": [
+            schedule.to_storage()
+            for schedule in data.get("on_call_schedules", [])
+        ],
+    }
+
+
+def restore_snapshot(stored):
+    """Return coordinator data rebuilt from a stored snapshot."""
+    return {
+        "user_id": stored["user_id"],
+        "services": [
+            Service.from_storage(values) for values in stored["services"]
+        ],
+        "incidents": [
+            Incident.from_storage(values) for values in stored["incidents"]
+        ],
+        "on_call_schedules": [
+            Schedule.from_storage(values)
+            for values in stored["on_call_schedules"]
+        ],
+    }
+
+
+class _SnapshotStorage(Store):
+    """Storage dropping snapshots written in an older format."""
+
+    async def _async_migrate_func(
+        self, old_major_version, old_minor_version, old_data
+    ):
+        """Drop an older snapshot instead of converting it."""
+        _LOGGER.debug(
+            f"Dropping PagerDuty snapshot of version {old_major_version}"
+        )
+        return None
+
+
+class PagerDutySnapshotStore:
+    """Keep the last good coordinator data in Home Assistant storage.
+
+    Saves are throttled: the first one of a run is written right away and
+    later ones at most every SNAPSHOT_SAVE_DELAY seconds, always with the
+    most recent data. Pending data is also written when Home Assistant stops.
+    """
+
+    def __init__(self, hass, entry_id):
+        """Initialize the store."""
+        self._store = _SnapshotStorage(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}"
+        )
+        self._pending = None
+        self._saved = False
+
+    async def async_load(self):
+        """Return the stored coordinator data, or None if there is none.
+
+        Snapshots written in an older format are ignored.
+        """
+        try:
+            stored = await self._store.async_load()
+            return restore_snapshot(stored) if stored else None
+        except (HomeAssistantError, KeyError, TypeError, ValueError) as e:
+            _LOGGER.warning(f"Failed to load PagerDuty snapshot: {e}")
+            return None
+
+    @callback
+    def async_save(self, data):
+        """Schedule saving the given coordinator data."""
+        scheduled = self._pending is not None
+        self._pending = data
+        if not scheduled:
+            self._store.async_delay_save(
+                self._data_to_save, SNAPSHOT_SAVE_DELAY if self._saved else 0
+            )
+
+    async def async_remove(self):
+        """Remove the stored snapshot."""
+        await self._store.async_remove()
+
+    @callback
+    def _data_to_save(self):
+        """Return the pending data in its stored form."""
+        data, self._pending = self._pending, None
+        self._saved = True
+        return compact_snapshot(data)
@@ -0,0 +1,156 @@
+"""Rolling incident statistics maintained from observed status changes."""
+
+from collections import defaultdict, deque
+from datetime import timedelta
+from homeassistant.util import dt as dt_util
+
+STATISTICS_SAMPLES = 50
+RATE_WINDOW_HOURS = 24
+ACTIVE_STATUSES = ("triggered", "acknowledged")
+
+
+class RollingDurations:
+    """Mean of the last STATISTICS_SAMPLES durations, kept as a running sum."""
+
+    __slots__ = ("samples", "total")
+
+    def __init__(self):
+        """Initialize an empty ring buffer."""
+        self.samples = deque(maxlen=STATISTICS_SAMPLES)
+        self.total = 0.0
+
+    def add(self, seconds):
+        """Add a duration in seconds, dropping the oldest when full."""
+        if len(self.samples) == self.samples.maxlen:
+            self.total -= self.samples[0]
+        self.samples.append(seconds)
+        self.total += seconds
+
+    def mean_minutes(self):
+        """Return the mean duration in minutes, or None without samples."""
+        if not self.samples:
+            return None
+        return round(self.total / len(self.samples) / 60, 1)
+
+
+class HourlyCounts:
+    """Incidents created per hour over the last RATE_WINDOW_HOURS hours."""
+
+    __slots__ = ("buckets",)
+
+    def __init__(self):
+        """Initialize empty buckets."""
+        self.buckets = {}
+
+    def add(self, created_at):
+        """Count an incident in the hour it was created."""
+        hour = int(created_at.timestamp() // 3600)
+        self.buckets[hour] = self.buckets.get(hour, 0) + 1
+        if len(self.buckets) > RATE_WINDOW_HOURS:
+            oldest = _current_hour() - RATE_WINDOW_HOURS
+            for expired in [key for key in self.buckets if key <= oldest]:
+                del self.buckets[expired]
+
+    def per_hour(self):
+        """Return the mean number of incidents per hour in the window."""
+        oldest = _current_hour() - RATE_WINDOW_HOURS
+        return round(
+            sum(count for hour, count in self.buckets.items() if hour > oldest)
+            / RATE_WINDOW_HOURS,
+            2,
+        )
+
+
+def _current_hour():
+    """Return the number of the current hour since the epoch."""
+    return int(dt_util.utcnow().timestamp() // 3600)
+
+
+def _expire(seen, oldest):
+    """Drop the IDs of a dict ordered by when they were seen before oldest."""
+    while seen and next(iter(seen.values())) < oldest:
+        del seen[next(iter(seen))]
+
+
+class IncidentStatistics:
+    """Acknowledge and resolve times and incident rates per service and team.
+
+    Updated from each incident change the coordinator sees, so the cost is
+    proportional to the changed incidents. Times are measured from an
+    incident's creation to its last status change, or to when the change
+    was seen if PagerDuty did not say. Incidents counted as created or
+    resolved are remembered for RATE_WINDOW_HOURS, so an incident seen
+    again, e.g. in overlapping syncs, is only sampled once.
+    """
+
+    def __init__(self):
+        """Initialize empty statistics."""
+        self.time_to_acknowledge = defaultdict(RollingDurations)
+        self.time_to_resolve = defaultdict(RollingDurations)
+        self.created = defaultdict(HourlyCounts)
+        self._counted = {}
+        self._resolved = {}
+        self._acknowledged = set()
+
+    def observe(self, previous, incident, team_id=None):
+        """Record the status change from a previous to a current incident.
+
+        An incident is counted as created whatever status it is first seen
+        in, so incidents resolved between two syncs still count.
+        """
+        keys = [("service", incident.service_id)]
+        if team_id:
+            keys.append(("team", team_id))
+        now = dt_util.utcnow()
+        window_start = now - timedelta(hours=RATE_WINDOW_HOURS)
+        _expire(self._counted, window_start)
+        _expire(self._resolved, window_start)
+
+        if incident.id not in self._counted:
+            self._counted[incident.id] = now
+            if incident.created_at and incident.created_at > window_start:
+                for key in keys:
+                    self.created[key].add(incident.created_at)
+        if (
+            incident.status == "acknowledged"
+            and incident.id not in self._acknowledged
+        ):
+            self._acknowledged.add(incident.id)
+            self._add_duration(self.time_to_acknowledge, keys, incident)
+        elif (
+            incident.status == "resolved" and incident.id not in self._resolved
+        ):
+            self._resolved[incident.id] = now
+            self._add_duration(self.time_to_resolve, keys, incident)
+            self.forget(incident.id)
+
+    def forget(self, incident_id):
+        """Stop tracking an incident that is no longer open."""
+        self._acknowledged.discard(incident_id)
+
+    def mean_time_to_acknowledge(self, key):
+        """Return the mean time to acknowledge in minutes."""
+        durations = self.time_to_acknowledge.get(key)
+        return durations.mean_minutes() if durations is not None else None
+
+    def mean_time_to_resolve(self, key):
+        """Return the mean time to resolve in minutes."""
+        durations = self.time_to_resolve.get(key)
+        return durations.mean_minutes() if durations is not None else None
+
+    def incidents_per_hour(self, key):
+        """Return the incidents created per hour over the rate window."""
+        counts = self.created.get(key)
+        return counts.per_hour() if counts is not None else 0
+
+    @staticmethod
+    def _add_duration(durations, keys, incident):
+        """Add an incident's time from creation to its status change."""
+        if incident.created_at is None:
+            return
+        changed_at = incident.last_status_change_at or dt_util.utcnow()
+        seconds = (changed_at - incident.created_at).total_seconds()
+        if seconds < 0:
+            return
+        for key in keys:
+            durations[key].add(seconds)
@@ -0,0 +1,114 @@
+"""Receive PagerDuty v3 webhooks for incident updates."""
+
+import hashlib
+import hmac
+import json
+import logging
+from aiohttp import web
+from homeassistant.components import webhook
+from homeassistant.const import CONF_WEBHOOK_ID
+from homeassistant.helpers.network import NoURLAvailableError
+from .const import DOMAIN, CONF_WEBHOOK_SECRET
+from .models import Incident
+
+_LOGGER = logging.getLogger(__name__)
+
+SIGNATURE_HEADER = "X-PagerDuty-Signature"
+
+
+def sign_payload(secret, body):
+    """Return the v1 signature PagerDuty sends for a payload."""
+    digest = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return f"v1={digest}"
+
+
+def verify_signature(secret, body, header):
+    """Return whether any signature in the header matches the payload.
+
+    PagerDuty sends a comma-separated list while a secret is being rotated.
+    """
+    if not secret or not header:
+        return False
+    expected = sign_payload(secret, body)
+    return any(
+        hmac.compare_digest(expected, signature.strip())
+        for signature in header.split(",")
+    )
+
+
+def incident_from_webhook(data):
+    """Convert webhook incident data to an incident record."""
+    return Incident.from_api(
+        {
+            "id": data["id"],
+            "service": data.get("service") or {},
+            "urgency": data.get("urgency"),
+            "status": data.get("status"),
+            "title": data.get("title"),
+            "description": data.get("description", data.get("title")),
+            "created_at": data.get("created_at"),
+            "assignments": [
+                {"assignee": assignee}
+                for assignee in data.get("assignees", [])
+            ],
+        }
+    )
+
+
+async def async_handle_webhook(hass, webhook_id, request):
+    """Apply an incident event from PagerDuty to the coordinator data."""
+    for entry in hass.config_entries.async_entries(DOMAIN):
+        if entry.options.get(CONF_WEBHOOK_ID) == webhook_id:
+            entry_data = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+            secret = entry.options.get(CONF_WEBHOOK_SECRET)
+            break
+    else:
+        return web.Response(status=404)
+
+    body = await request.read()
+    if not verify_signature(
+        secret, body, request.headers.get(SIGNATURE_HEADER)
+    ):
+        _LOGGER.warning("Rejected PagerDuty webhook with invalid signature")
+        return web.Response(status=401)
+
+    if not entry_data:
+        return web.Response(status=503)
+
+    try:
+        event = json.loads(body)["event"]
+    except (ValueError, KeyError, TypeError):
+        return web.Response(status=400)
+
+    _LOGGER.debug(f"Received PagerDuty webhook event: {event}")
+    data = event.get("data") or {}
+    if event.get("resource_type") == "incident" and data.get("type") == (
+        "incident"
+    ):
+        entry_data["coordinator"].async_apply_incident(
+            incident_from_webhook(data)
+        )
+    return web.Response(status=200)
+
+
+def async_register_webhook(hass, entry):
+    """Register the entry's webhook endpoint."""
+    webhook_id = entry.options[CONF_WEBHOOK_ID]
+    webhook.async_register(
+        hass,
+        DOMAIN,
+        "PagerDuty",
+        webhook_id,
+        async_handle_webhook,
+        allowed_methods=["POST"],
+    )
+    entry.async_on_unload(lambda: webhook.async_unregister(hass, webhook_id))
+    _LOGGER.debug(f"Registered PagerDuty webhook {webhook_id}")
+
+
+def webhook_url(hass, webhook_id):
+    """Return the URL to configure in the PagerDuty webhook subscription."""
+    try:
+        return webhook.async_generate_url(hass, webhook_id)
+    except NoURLAvailableError:
+        return webhook.async_generate_path(webhook_id)
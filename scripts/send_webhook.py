@@ -0,0 +1,123 @@
+"""Send a signed sample PagerDuty v3 webhook to Home Assistant.
+
+Stands in for PagerDuty when testing the integration's webhook push mode
+end to end, e.g.:
+
+    python scripts/send_webhook.py \\
+        http://localhost:8123/api/webhook/<webhook_id> <secret> \\
+        --event incident.acknowledged --incident PABC123 --service PSVC123
+"""
+
+import argparse
+import hashlib
+import hmac
+import json
+import sys
+import urllib.error
+import urllib.request
+import uuid
+from datetime import datetime, timezone
+
+STATUSES = {
+    "incident.triggered": "triggered",
+    "incident.acknowledged": "acknowledged",
+    "incident.unacknowledged": "triggered",
+    "incident.reassigned": "triggered",
+    "incident.escalated": "triggered",
+    "incident.reopened": "triggered",
+    "incident.resolved": "resolved",
+}
+
+
+def build_payload(args):
+    """Return a v3 webhook payload for an incident event."""
+    now = datetime.now(timezone.utc).isoformat()
+    return {
+        "event": {
+            "id": uuid.uuid4().hex,
+            "event_type": args.event,
+            "resource_type": "incident",
+            "occurred_at": now,
+            "agent": None,
+            "client": None,
+            "data": {
+                "id": args.incident,
+                "type": "incident",
+                "self": f"https://api.pagerduty.com/incidents/{args.incident}",
+                "number": 1,
+                "status": args.status or STATUSES[args.event],
+                "incident_key": uuid.uuid4().hex,
+                "created_at": now,
+                "title": args.title,
+                "service": {
+                    "id": args.service,
+                    "type": "service_reference",
+                    "summary": args.service_name,
+                },
+                "assignees": [
+                    {
+                        "id": assignee,
+                        "type": "user_reference",
+                        "summary": assignee,
+                    }
+                    for assignee in args.assignee
+                ],
+                "escalation_policy": None,
+                "teams": [],
+                "priority": None,
+                "urgency": args.urgency,
+                "conference_bridge": None,
+                "resolve_reason": None,
+            },
+        }
+    }
+
+
+def main():
+    """Send the webhook and print the response status."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("url", help="Home Assistant webhook URL")
+    parser.add_argument("secret", help="Webhook signing secret")
+    parser.add_argument(
+        "--event", default="incident.triggered", choices=sorted(STATUSES)
+    )
+    parser.add_argument("--incident", default="PTEST01")
+    parser.add_argument("--service", required=True)
+    parser.add_argument("--service-name", default="Test service")
+    parser.add_argument("--title", default="Test incident from send_webhook")
+    parser.add_argument("--urgency", default="high", choices=["high", "low"])
+    parser.add_argument("--status", help="Override the event's status")
+    parser.add_argument(
+        "--assignee", action="append", default=[], help="Assigned user ID"
+    )
+    parser.add_argument(
+        "--bad-signature",
+        action="store_true",
+        help="Sign with the wrong secret to check rejection",
+    )
+    args = parser.parse_args()
+
+    body = json.dumps(build_payload(args)).encode()
+    secret = f"{args.secret}-wrong" if args.bad_signature else args.secret
+    signature = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    request = urllib.request.Request(
+        args.url,
+        data=body,
+        method="POST",
+        headers={
+            "Content-Type": "application/json",
+            "X-PagerDuty-Signature": f"v1={signature}",
+            "X-Webhook-Id": uuid.uuid4().hex,
+        },
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            print(response.status)
+    except urllib.error.HTTPError as err:
+        print(err.code)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())